@@ -0,0 +1,112 @@
+from typing import Callable, Dict, List;
+from argparse import ArgumentParser;
+from json import dumps;
+from platform import python_version;
+from random import seed;
+from sys import getsizeof;
+from time import perf_counter;
+import tic_tac_toe;
+from tic_tac_toe import (Board, Bot, Frozen_Bot, Perfect, Randomer, Smart_Randomer, default_alpha, default_batch_size, default_epsilon,
+                         get_line_table, set_board_size);
+
+
+def measure(function: Callable[[], object], repeats: int = 3) -> float:
+    best = float('inf');
+    for _ in range(0, repeats):
+        started = perf_counter();
+        function();
+        best = min(best, perf_counter() - started);
+    return best;
+
+
+def build_board(winning_item: str = 'x') -> Board:
+    board = Board(winning_item);
+    board.position.search_positions();
+    return board;
+
+
+def bench_search(size: int, random_seed: int) -> Dict[str, float]:
+    set_board_size(size);
+    seed(random_seed);
+    started = perf_counter();
+    board = build_board();
+    seconds = perf_counter() - started;
+    positions = len(board.graph);
+    ids = board.graph.ids;
+    ids_bytes = getsizeof(ids) + sum(getsizeof(key) + getsizeof(position_id) for key, position_id in ids.items());
+    return {'board_size': size, 'positions': positions, 'seconds': seconds, 'positions_per_sec': positions / seconds,
+            'array_bytes_per_position': board.graph.get_bytes() / positions, 'ids_bytes_per_position': ids_bytes / positions};
+
+
+def bench_positions(board: Board, random_seed: int) -> Dict[str, float]:
+    seed(random_seed);
+    positions = list(board.all_positions.values());
+    playable = [position for position in positions if board.graph.get_children_count(position.id) > 0];
+    line_table = get_line_table();
+    moves = [(position.masks, position.last_move) for position in positions];
+    winner_seconds = measure(lambda: [line_table.get_winner(masks, last_move) for masks, last_move in moves]);
+    best_move_seconds = measure(lambda: [position.get_best_move() for position in playable]);
+    return {'get_winner_per_sec': len(positions) / winner_seconds, 'get_best_move_per_sec': len(playable) / best_move_seconds};
+
+
+def bench_play(board: Board, opponent_type: type, games_count: int, random_seed: int, batch_size: int = None) -> Dict[str, float]:
+    seed(random_seed);
+    board.reset();
+    bot = Bot(board, default_epsilon, default_alpha, board.winning_item, 'Benchmark bot');
+    opponent = opponent_type(board, next(item for item in tic_tac_toe.available_items if item != board.winning_item));
+    board.play_many([bot, opponent], 1, batch_size);
+    board.reset();
+    bot.games_history.clear();
+    started = perf_counter();
+    board.play_many([bot, opponent], games_count, batch_size);
+    seconds = perf_counter() - started;
+    return {'opponent': opponent_type.__name__, 'batch_size': batch_size, 'games': games_count, 'seconds': seconds,
+            'games_per_sec': games_count / seconds, 'win_rate': bot.games_history.count(True) / games_count};
+
+
+def bench_evaluate(board: Board, games_count: int, random_seed: int, batch_size: int = None) -> Dict[str, float]:
+    seed(random_seed);
+    board.reset();
+    bot = Bot(board, default_epsilon, default_alpha, board.winning_item, 'Benchmark bot');
+    opponent = Randomer(board, next(item for item in tic_tac_toe.available_items if item != board.winning_item));
+    board.play_many([bot, opponent], games_count);
+    started = perf_counter();
+    frozen_bot: Frozen_Bot = bot.freeze();
+    compile_seconds = perf_counter() - started;
+    started = perf_counter();
+    board.play_many([frozen_bot, opponent], games_count, batch_size);
+    seconds = perf_counter() - started;
+    return {'batch_size': batch_size, 'games': games_count, 'compile_seconds': compile_seconds, 'seconds': seconds,
+            'games_per_sec': games_count / seconds, 'win_rate': frozen_bot.games_history.count(True) / games_count};
+
+
+def run(sizes: List[int], games_count: int, random_seed: int) -> Dict[str, object]:
+    results: Dict[str, object] = {'python': python_version(), 'seed': random_seed, 'games': games_count};
+    results['search'] = [bench_search(size, random_seed) for size in sizes];
+    set_board_size(3);
+    board = build_board();
+    results['positions'] = bench_positions(board, random_seed);
+    results['play'] = [bench_play(board, Randomer, games_count, random_seed),
+                       bench_play(board, Smart_Randomer, games_count, random_seed),
+                       bench_play(board, Perfect, games_count, random_seed)];
+    if board.can_play_batch([Bot(board, default_epsilon, default_alpha), Randomer(board, 'o')]):
+        results['play'].append(bench_play(board, Randomer, games_count, random_seed, default_batch_size));
+    results['evaluate'] = [bench_evaluate(board, games_count, random_seed)];
+    if board.can_play_batch([Randomer(board, 'o')]):
+        results['evaluate'].append(bench_evaluate(board, games_count, random_seed, default_batch_size));
+    return results;
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='[JustGINCS] Benchmarks of the Tic-Tac-Toe engine hot paths');
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 4], help='board sizes for the full search benchmark');
+    parser.add_argument('--games', type=int, default=20000, help='games per play_many benchmark');
+    parser.add_argument('--seed', type=int, default=0);
+    parser.add_argument('--output', type=str, default=None, help='JSON file for the results (stdout by default)');
+    arguments = parser.parse_args();
+    report = dumps(run(arguments.sizes, arguments.games, arguments.seed), indent=2);
+    if arguments.output is None:
+        print(report);
+    else:
+        with open(arguments.output, 'w') as file:
+            file.write(report);
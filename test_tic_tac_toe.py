@@ -0,0 +1,374 @@
+from array import array;
+from io import BytesIO;
+from random import Random, seed;
+from sys import modules;
+from threading import Thread;
+from typing import Dict, Iterator, List;
+import pytest;
+from tic_tac_toe import (Board, Bot, Convergence, Game_Log, Learner, Line_Table, Perfect, Randomer, Smart_Randomer, apply_batch_update,
+                         apply_snapshot, available_items, default_batch_size, default_mean_delta, set_board_size, whitespace);
+
+
+@pytest.fixture(autouse=True)
+def classic_board() -> Iterator[None]:
+    set_board_size(3);
+    seed(0);
+    yield;
+    set_board_size(3);
+
+
+def get_scanned_winner(cells: List[str], size: int, length: int) -> str | None:
+    for item in available_items:
+        for row in range(0, size):
+            for column in range(0, size):
+                for row_step, column_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    if all(0 <= row + row_step * i < size and 0 <= column + column_step * i < size and
+                           cells[(row + row_step * i) * size + column + column_step * i] == item for i in range(0, length)):
+                        return item;
+    return None;
+
+
+def assert_best_edges_consistent(board: Board) -> None:
+    graph = board.graph;
+    for position_id, (max_value, edges) in board.best_edges.items():
+        start, end = graph.child_starts[position_id], graph.child_ends[position_id];
+        child_values = [board.values[child_id] for child_id in graph.child_ids[start:end]];
+        assert max_value == max(child_values);
+        assert sorted(edges) == [start + index for index, value in enumerate(child_values) if value == max_value];
+
+
+def get_string_positions(size: int, length: int) -> Dict[str, str | None]:
+    positions: Dict[str, str | None] = dict();
+    stack = [whitespace * (size * size)];
+    while len(stack) > 0:
+        cells = stack.pop();
+        if cells in positions:
+            continue;
+        positions[cells] = get_scanned_winner(list(cells), size, length);
+        if positions[cells] is not None or whitespace not in cells:
+            continue;
+        item = available_items[(size * size - cells.count(whitespace)) % len(available_items)];
+        stack.extend(cells[:index] + item + cells[index + 1:] for index, cell in enumerate(cells) if cell == whitespace);
+    return positions;
+
+
+@pytest.mark.parametrize('size, length', [(3, 3), (4, 3), (4, 4), (5, 4), (6, 5)])
+def test_line_table_matches_scan(size: int, length: int) -> None:
+    table = Line_Table(size, length);
+    generator = Random(size * 10 + length);
+    for _ in range(0, 2000):
+        cells = [generator.choice(available_items + [whitespace]) for _ in range(0, size * size)];
+        masks = tuple(sum(1 << index for index, cell in enumerate(cells) if cell == item) for item in available_items);
+        assert table.get_winner(masks) == get_scanned_winner(cells, size, length);
+        last_move = generator.randrange(0, size * size);
+        if cells[last_move] != whitespace and get_scanned_winner(cells[:last_move] + [whitespace] + cells[last_move + 1:], size, length) is None:
+            assert table.get_winner(masks, last_move) == get_scanned_winner(cells, size, length);
+
+
+def test_graph_matches_string_positions() -> None:
+    board = Board('x');
+    board.position.search_positions();
+    graph_positions = {position.to_string(): position.get_winner() for position in board.all_positions.values()};
+    assert len(graph_positions) == len(board.graph);
+    assert graph_positions == get_string_positions(3, 3);
+
+
+def test_save_load_round_trip(tmp_path) -> None:
+    board = Board('x');
+    board.position.search_positions();
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 500);
+    path = str(tmp_path / 'bot_x.bin');
+    bot.save(path);
+    loaded = Bot(None, 0.0, 0.0, 'x', 'Loaded (x)');
+    loaded.load(path);
+    assert (loaded.alfa, loaded.epsilon) == (pytest.approx(0.2), pytest.approx(0.1));
+    assert list(loaded.board.values) == list(array('f', board.values));
+    for column, loaded_column in zip(board.graph.masks + [board.graph.winners, board.graph.child_starts, board.graph.child_ends,
+                                                          board.graph.child_ids], loaded.board.graph.masks + [
+            loaded.board.graph.winners, loaded.board.graph.child_starts, loaded.board.graph.child_ends, loaded.board.graph.child_ids]):
+        assert list(column) == list(loaded_column);
+
+
+@pytest.mark.parametrize('item', available_items)
+def test_perfect_never_loses(item: str) -> None:
+    board = Board('x');
+    board.position.search_positions();
+    perfect = Perfect(board, item, f'Perfect {item}');
+    opponents = [Randomer(board, other, f'Randomer {other}') for other in available_items if other != item];
+    board.play_many([perfect] + opponents, 300);
+    assert perfect.games_history.count(False) == 0;
+    rival = Perfect(board, opponents[0].item, 'Perfect rival');
+    board.play_many([perfect, rival], 20);
+    assert perfect.games_history.count(False) == 0 and rival.games_history.count(None) == 20;
+
+
+def test_game_log_keeps_every_parallel_game(tmp_path) -> None:
+    board = Board('x');
+    board.position.search_positions();
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    path = str(tmp_path / 'games.log');
+    log = Game_Log(path);
+    log.attach(board);
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 2000, default_batch_size, 4);
+    log.detach(board);
+    log.close();
+    records = list(Game_Log.read(path));
+    assert len(records) == 2000;
+    assert [None if winner_index < 0 else winner_index == 0 for winner_index, _, _ in records] == list(bot.games_history);
+    learner = Bot(Board('x'), 0.0, 0.2, 'x', 'Learner (x)');
+    learner.board.position.search_positions();
+    assert learner.learn_from_log(path) == 2000;
+
+
+def test_loaded_lazy_board_keeps_position_limit(tmp_path) -> None:
+    set_board_size(4, 3);
+    board = Board('x', lazy=True);
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 300);
+    path = str(tmp_path / 'bot_x.bin');
+    bot.save(path);
+    loaded = Bot(None, 0.0, 0.0, 'x', 'Loaded (x)');
+    loaded.load(path, max_positions=500);
+    assert loaded.board.lazy and loaded.board.max_positions == 500;
+    loaded.board.play_many([loaded, Randomer(loaded.board, 'o', 'Randomer o')], 300);
+    assert len(loaded.board.graph) <= 500 + 16 * 16;
+    assert loaded.board.graph.compactions > 0;
+
+
+def test_game_log_hooks_run_without_timers() -> None:
+    board = Board('x', symmetric=True);
+    board.position.search_positions();
+    log = Game_Log(file=BytesIO());
+    log.attach(board);
+    board.play_many([Randomer(board, 'x', 'Randomer x'), Randomer(board, 'o', 'Randomer o')], 50);
+    assert board.stats.timers == dict() and board.stats.counters['games'] == 50;
+    log.detach(board);
+    assert board.stats is None;
+    stats = board.enable_stats();
+    log.attach(board);
+    log.detach(board);
+    assert board.stats is stats and stats.timing;
+    records = list(Game_Log.read_buffer(log.file.getvalue()));
+    assert len(records) == 50;
+    for winner_index, _, moves in records:
+        masks = [0 for _ in available_items];
+        for move_index, move in enumerate(moves):
+            masks[move_index % len(available_items)] |= 1 << move;
+        winner = Line_Table(3, 3).get_winner(tuple(masks));
+        assert len(set(moves)) == len(moves) and winner_index == (-1 if winner is None else available_items.index(winner));
+
+
+def test_plot_export_leaves_pyplot_alone(tmp_path) -> None:
+    pytest.importorskip('matplotlib');
+    pyplot_loaded = 'matplotlib.pyplot' in modules;
+    player = Randomer(None, 'x', 'Randomer x');
+    [player.fix_game(index % 3 == 0) for index in range(0, 1000)];
+    player.throw_me_some_numbers(path=str(tmp_path / 'curve.png'));
+    player.throw_me_some_numbers(path=str(tmp_path / 'curve.csv'));
+    assert (tmp_path / 'curve.png').read_bytes()[:8] == b'\x89PNG\r\n\x1a\n';
+    assert (tmp_path / 'curve.csv').read_text().splitlines()[1] == '5.0,0.4';
+    assert ('matplotlib.pyplot' in modules) == pyplot_loaded;
+
+
+def test_trimmed_history_keeps_counts_and_exact_curve(tmp_path) -> None:
+    generator = Random(5);
+    outcomes = [generator.choice([True, False, None, True]) for _ in range(0, 12345)];
+    bot = Bot(None, 0.1, 0.2, 'x', 'Bot (x)', max_history=1000);
+    [bot.fix_game(outcome) for outcome in outcomes];
+    history = bot.games_history;
+    assert history.first_index > 0 and len(history) == len(outcomes);
+    assert [history.count(outcome) for outcome in (True, False, None)] == [outcomes.count(outcome) for outcome in (True, False, None)];
+    assert history[-300:] == outcomes[-300:] and history[-1] == outcomes[-1];
+    for trimmed in (lambda: history[0], lambda: history[:], lambda: list(history), lambda: history.get_wins_before(history.bucket_size + 1)):
+        with pytest.raises(IndexError):
+            trimmed();
+    assert history.get_wins_before(2000) == outcomes[:2000].count(True);
+    bot.throw_me_some_numbers(path=str(tmp_path / 'curve.csv'));
+    rows = [row.split(',') for row in (tmp_path / 'curve.csv').read_text().splitlines()[1:]];
+    step = int(2 * float(rows[0][0]));
+    assert step % history.bucket_size == 0;
+    assert [float(mean) for _, mean in rows] == [outcomes[index * step:(index + 1) * step].count(True) / step for index in range(0, len(rows))];
+
+
+def test_play_stats_count_best_move_cache_use() -> None:
+    board = Board('x');
+    board.position.search_positions();
+    bot = Bot(board, 0.0, 0.2, 'x', 'Bot (x)');
+    stats = board.enable_stats();
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 2000);
+    counters = stats.counters;
+    assert counters['best_move_cache_hits'] > counters['best_move_cache_misses'] > 0;
+    assert counters['best_move_cache_hits'] + counters['best_move_cache_misses'] == counters['own_board_moves'];
+    assert 'cross_board_lookups' not in counters and set(stats.timers) >= {'terminal', 'get_move', 'check', 'select', 'td_update'};
+
+
+def test_shared_graph_trains_on_two_threads() -> None:
+    board_x = Board('x');
+    board_x.position.search_positions();
+    board_o = Board('o', graph=board_x.graph);
+    bot_x, bot_o = Bot(board_x, 0.1, 0.2, 'x', 'Bot (x)'), Bot(board_o, 0.1, 0.2, 'o', 'Bot (o)');
+    threads = [Thread(target=board.play_many, args=([bot, opponent], 3000)) for board, bot, opponent in (
+        (board_x, bot_x, Randomer(board_x, 'o', 'Randomer o')), (board_o, bot_o, Randomer(board_o, 'x', 'Randomer x')))];
+    [thread.start() for thread in threads];
+    [thread.join() for thread in threads];
+    assert len(bot_x.games_history) == len(bot_o.games_history) == 3000;
+    assert_best_edges_consistent(board_x);
+    assert_best_edges_consistent(board_o);
+
+
+def test_lazy_board_matches_full_graph() -> None:
+    full_board = Board('x');
+    full_board.position.search_positions();
+    board = Board('x', lazy=True);
+    bot = Bot(board, 0.2, 0.2, 'x', 'Bot (x)');
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 500);
+    assert 1 < len(board.graph) < len(full_board.graph) and len(bot.games_history) == 500;
+    for key, position in board.all_positions.items():
+        assert full_board.all_positions[key].get_winner() == position.get_winner();
+        if board.graph.child_starts[position.id] >= 0:
+            assert sorted(child.key for child in position.get_next_positions()) == sorted(
+                child.key for child in full_board.all_positions[key].get_next_positions());
+
+
+def test_symmetric_graph_covers_full_graph() -> None:
+    full_board = Board('x');
+    full_board.position.search_positions();
+    board = Board('x', symmetric=True);
+    board.position.search_positions();
+    assert len(board.graph) == 765;
+    for position in full_board.all_positions.values():
+        canonical = board.find_masks(position.masks);
+        assert canonical.masks == position.masks and canonical.get_winner() == position.get_winner();
+        assert sorted(child.key for child in canonical.get_next_positions()) == sorted(
+            child.key for child in position.get_next_positions());
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 3000);
+    assert len(bot.games_history) == 3000 and bot.games_history.count(True) > 2400;
+
+
+def test_batch_engine_plays_legal_games() -> None:
+    pytest.importorskip('numpy');
+    board = Board('x');
+    board.position.search_positions();
+    randomer_x, randomer_o = Randomer(board, 'x', 'Randomer x'), Randomer(board, 'o', 'Randomer o');
+    assert board.can_play_batch([randomer_x, randomer_o]);
+    board.play_many([randomer_x, randomer_o], 40000, 4096);
+    rates = [randomer_x.games_history.count(outcome) / 40000 for outcome in (True, False, None)];
+    assert rates == pytest.approx([0.585, 0.288, 0.127], abs=0.015);
+    assert randomer_o.games_history.count(True) == randomer_x.games_history.count(False);
+    bot = Bot(board, 0.05, 0.1, 'x', 'Bot (x)');
+    board.play_many([bot, randomer_o], 40000, 4096);
+    assert len(bot.games_history) == 40000 and bot.games_history[-10000:].count(True) > 9000;
+    assert_best_edges_consistent(board);
+
+
+def test_parallel_play_merges_values_and_histories() -> None:
+    board = Board('x');
+    board.position.search_positions();
+    bot, randomer = Bot(board, 0.05, 0.1, 'x', 'Bot (x)'), Randomer(board, 'o', 'Randomer o');
+    if not board.can_play_parallel([bot, randomer]):
+        pytest.skip('fork start method is not available');
+    initial_values = list(board.values);
+    board.position.get_best_move();
+    board.play_many([bot, randomer], 4000, None, 2);
+    assert len(bot.games_history) == len(randomer.games_history) == 4000;
+    assert bot.games_history.count(True) == randomer.games_history.count(False);
+    assert list(board.values) != initial_values and board.cache_best_edges and len(board.best_edges) == 0;
+    assert board.delta_count > 0;
+    board.play_many([bot.freeze(), randomer], 1000);
+    assert randomer.games_history[-1000:].count(True) < 100;
+
+
+def test_reset_restores_initial_values() -> None:
+    board = Board('x');
+    board.position.search_positions();
+    initial_values = list(board.values);
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 1000);
+    assert list(board.values) != initial_values and len(board.best_edges) > 0;
+    board.reset();
+    assert list(board.values) == initial_values and len(board.best_edges) == 0 and board.resets == 1;
+    assert list(Board('x', graph=board.graph).values) == initial_values;
+
+
+def test_best_move_cache_survives_patching_and_compaction() -> None:
+    set_board_size(4, 3);
+    board = Board('x', lazy=True, max_positions=2000);
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    opponent = Randomer(board, 'o', 'Randomer o');
+    board.play_many([bot, opponent], 1500);
+    assert board.graph.compactions > 0 and len(board.best_edges) > 0;
+    assert_best_edges_consistent(board);
+    board.cache_best_edges = False;
+    board.best_edges.clear();
+    board.play_many([bot, opponent], 100);
+    assert len(board.best_edges) == 0;
+
+
+def test_trajectories_do_not_outlive_shrink_or_reset() -> None:
+    set_board_size(4, 3);
+    board = Board('x', lazy=True, max_positions=2000);
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)', trace_decay=0.5, backup_games=10);
+    board.play_many([bot, Smart_Randomer(board, 'o', 'Smart Randomer o')], 1500);
+    assert board.graph.compactions > 0 and len(bot.games_history) == 1500;
+    set_board_size(3);
+    board = Board('x');
+    board.position.search_positions();
+    initial_values = list(board.values);
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)', trace_decay=0.5, backup_games=10);
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 5);
+    assert bot.buffered_games == 5 and list(board.values) == initial_values;
+    board.reset();
+    bot.backup();
+    assert bot.buffered_games == 0 and list(board.values) == initial_values;
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 10);
+    assert bot.buffered_games == 0 and list(board.values) != initial_values;
+
+
+def test_convergence_reads_accumulated_deltas() -> None:
+    board = Board('x');
+    board.position.search_positions();
+    board.set_value(1, board.values[1] + 0.25);
+    board.set_value(2, board.values[2] - 0.05);
+    assert (board.delta_max, board.delta_sum, board.delta_count) == (pytest.approx(0.25), pytest.approx(0.3), 2);
+    numpy = pytest.importorskip('numpy');
+    values = numpy.array([0.5, 0.5, 0.0]);
+    assert apply_batch_update(values, numpy.array([0, 0, 2]), numpy.array([1.0, 0.0, 1.0]), 0.1) == (
+        pytest.approx(0.1), pytest.approx(0.2), 3);
+    board.reset();
+    bot = Bot(board, 0.05, 0.1, 'x', 'Bot (x)');
+    convergence = Convergence(check_games=1000);
+    played = board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 300000, None, None, convergence);
+    assert convergence.converged and played == convergence.games_played == len(bot.games_history) < 150000;
+    assert all(entry['mean_delta'] <= entry['max_delta'] <= 1.0 for entry in convergence.history);
+    assert convergence.history[-1]['mean_delta'] <= default_mean_delta < convergence.history[0]['mean_delta'];
+    assert board.delta_count == 0;
+
+
+def test_snapshots_respect_limits_and_do_not_expand_workers() -> None:
+    board = Board('x', lazy=True, max_positions=200);
+    bot = Bot(board, 0.1, 0.2, 'x', 'Bot (x)');
+    board.play_many([bot, Randomer(board, 'o', 'Randomer o')], 300);
+    board.expand(0);
+    [board.expand(position_id) for position_id in list(board.graph.get_children(0))];
+    assert len(board.graph) > 200;
+    learner = Learner(bot);
+    try:
+        snapshot = learner.get_snapshot();
+    finally:
+        learner.close();
+    assert snapshot[0] == 'positions' and len(board.graph) <= 200;
+    worker = Board('x', lazy=True);
+    worker.expand(0);
+    positions_count = len(worker.graph);
+    apply_snapshot(worker, snapshot);
+    assert len(worker.graph) == positions_count;
+    for key, position in worker.all_positions.items():
+        if key in board.all_positions:
+            assert position.value == board.all_positions[key].value;
+    full_board = Board('x');
+    full_board.position.search_positions();
+    values = array('d', (index / len(full_board.values) for index in range(0, len(full_board.values))));
+    apply_snapshot(full_board, ('values', values.tobytes()));
+    assert list(full_board.values) == list(values);
@@ -1,12 +1,34 @@
-from typing import Dict, List, TypeVar;
-from random import choice, random;
-from matplotlib import pyplot;
+from typing import BinaryIO, Callable, Dict, Iterator, List, Tuple, TypeVar;
+from random import choice, getrandbits, random, seed;
+from importlib.util import find_spec;
+from time import perf_counter;
+from array import array;
+from collections.abc import Mapping;
+from weakref import ref;
+from mmap import mmap, ACCESS_COPY, ACCESS_READ;
+from struct import calcsize, pack, unpack_from;
+from threading import Event, Thread;
+from io import BytesIO;
+from os import urandom;
 
 Position = TypeVar('Position');
 Player = TypeVar('Player');
 Board = TypeVar('Board');
 Comfortable_Counter = TypeVar('Comfortable_Counter');
+Line_Table = TypeVar('Line_Table');
+Symmetry_Table = TypeVar('Symmetry_Table');
+Game_Graph = TypeVar('Game_Graph');
+NDArray = TypeVar('NDArray');
+Generator = TypeVar('Generator');
+Games_History = TypeVar('Games_History');
+Play_Stats = TypeVar('Play_Stats');
+Frozen_Bot = TypeVar('Frozen_Bot');
+Training_Job = TypeVar('Training_Job');
+Convergence = TypeVar('Convergence');
+Game_Log = TypeVar('Game_Log');
+Learner = TypeVar('Learner');
 board_size: int = 3;
+winning_length: int = board_size;
 available_items: List[str] = ['x', 'o'];
 default_value: float = 0.5;
 win_value: float = 1.0;
@@ -15,6 +37,32 @@ draw_value: float = 0.5;
 whitespace: str = ' ';
 default_alpha: float = 0.1;
 default_epsilon: float = 0.05;
+default_batch_size: int = 4096;
+default_max_history: int | None = None;
+default_bucket_size: int = 100;
+default_perfect_depth: int = 4;
+default_chunk_size: int = 1000;
+default_mean_delta: float = 3e-3;
+default_win_rate_delta: float = 0.01;
+default_patience: int = 3;
+default_snapshot_games: int = 10000;
+default_worker_timeout: float = 5.0;
+perfect_score: int = 100;
+line_tables: Dict[Tuple[int, int], Line_Table] = dict();
+symmetry_tables: Dict[int, Symmetry_Table] = dict();
+parallel_state: Dict[str, object] = dict();
+transposition_tables: Dict[Tuple[int, int], Dict[int, Tuple[int, int, int, int]]] = dict();
+file_magic: bytes = b'JUSTGINC';
+file_version: int = 1;
+file_header: str = '<8sIIIIBBBxddQQ';
+file_header_fields: List[str] = ['magic', 'version', 'board_size', 'winning_length', 'item_count', 'winning_item',
+                                 'symmetric', 'lazy', 'alfa', 'epsilon', 'positions_count', 'edges_count'];
+log_magic: bytes = b'JUSTGLOG';
+log_version: int = 1;
+log_header: str = '<8sIIII';
+log_header_fields: List[str] = ['magic', 'version', 'board_size', 'winning_length', 'item_count'];
+log_record: str = '<IbB';
+logged_player_types: List[str] = ['Human', 'Randomer', 'Smart_Randomer', 'Perfect', 'Bot', 'Frozen_Bot'];
 
 
 class Comfortable_Counter:
@@ -31,130 +79,1329 @@ class Comfortable_Counter:
         return self.current_value;
 
 
+class Line_Table:
+
+    size: int;
+    length: int;
+    lines: List[Tuple[int, ...]];
+    line_masks: List[int];
+    masks_through: List[List[int]];
+
+    def __init__(self, size: int = board_size, length: int = winning_length) -> None:
+        self.size = size;
+        self.length = length;
+        self.lines = list();
+        for row in range(0, size):
+            for column in range(0, size):
+                for row_step, column_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    last_row = row + row_step * (length - 1);
+                    last_column = column + column_step * (length - 1);
+                    if last_row >= size or last_column < 0 or last_column >= size:
+                        continue;
+                    self.lines.append(tuple((row + row_step * i) * size + column + column_step * i for i in range(0, length)));
+        self.line_masks = [sum(1 << index for index in line) for line in self.lines];
+        self.masks_through = [[line_mask for line_mask in self.line_masks if line_mask >> index & 1]
+                              for index in range(0, size * size)];
+
+    def get_winner(self, masks: Tuple[int, ...], last_move: int = None) -> str | None:
+        if last_move is None:
+            for item, mask in zip(available_items, masks):
+                if any(mask & line_mask == line_mask for line_mask in self.line_masks):
+                    return item;
+            return None;
+        move_mask = 1 << last_move;
+        for item, mask in zip(available_items, masks):
+            if mask & move_mask:
+                return item if any(mask & line_mask == line_mask for line_mask in self.masks_through[last_move]) else None;
+        return None;
+
+
+def set_board_size(size: int, length: int = None) -> None:
+    global board_size, winning_length;
+    board_size = size;
+    winning_length = size if length is None else length;
+
+
+def get_line_table(size: int = None, length: int = None) -> Line_Table:
+    size = board_size if size is None else size;
+    length = winning_length if length is None else length;
+    if (size, length) not in line_tables:
+        line_tables[(size, length)] = Line_Table(size, length);
+    return line_tables[(size, length)];
+
+
+class Symmetry_Table:
+
+    size: int;
+    permutations: List[Tuple[int, ...]];
+    compose: List[List[int]];
+    inverse: List[int];
+    byte_tables: List[List[List[int]]];
+
+    def __init__(self, size: int = board_size) -> None:
+        self.size = size;
+        last = size - 1;
+        cell_maps = [lambda r, c: (r, c), lambda r, c: (c, last - r), lambda r, c: (last - r, last - c),
+                     lambda r, c: (last - c, r), lambda r, c: (r, last - c), lambda r, c: (last - r, c),
+                     lambda r, c: (c, r), lambda r, c: (last - c, last - r)];
+        self.permutations = list();
+        for cell_map in cell_maps:
+            self.permutations.append(tuple(cell_map(index // size, index % size)[0] * size
+                                           + cell_map(index // size, index % size)[1] for index in range(0, size * size)));
+        self.compose = [[self.permutations.index(tuple(first[second[index]] for index in range(0, size * size)))
+                         for second in self.permutations] for first in self.permutations];
+        self.inverse = [row.index(0) for row in self.compose];
+        self.byte_tables = [[[sum(1 << permutation[chunk * 8 + bit] for bit in range(0, 8)
+                                  if byte >> bit & 1 and chunk * 8 + bit < size * size) for byte in range(0, 256)]
+                             for chunk in range(0, (size * size + 7) // 8)] for permutation in self.permutations];
+
+    def apply(self, symmetry: int, mask: int) -> int:
+        result = 0;
+        for chunk, table in enumerate(self.byte_tables[symmetry]):
+            result |= table[mask >> (chunk * 8) & 0xFF];
+        return result;
+
+    def canonize(self, masks: Tuple[int, ...]) -> Tuple[Tuple[int, ...], int]:
+        best_masks = masks;
+        best_key = to_key(masks);
+        best_symmetry = 0;
+        for symmetry in range(1, len(self.permutations)):
+            new_masks = tuple(self.apply(symmetry, mask) for mask in masks);
+            key = to_key(new_masks);
+            if key < best_key:
+                best_masks, best_key, best_symmetry = new_masks, key, symmetry;
+        return best_masks, best_symmetry;
+
+
+def get_symmetry_table(size: int = None) -> Symmetry_Table:
+    size = board_size if size is None else size;
+    if size not in symmetry_tables:
+        symmetry_tables[size] = Symmetry_Table(size);
+    return symmetry_tables[size];
+
+
+def read_header(path: str) -> Dict[str, object]:
+    with open(path, 'rb') as file:
+        header = dict(zip(file_header_fields, unpack_from(file_header, file.read(calcsize(file_header)))));
+    if header['magic'] != file_magic or header['version'] != file_version:
+        raise ValueError(f'[JustGINCS] {path} is not a saved board');
+    if (header['board_size'], header['winning_length'], header['item_count']) != (board_size, winning_length, len(available_items)):
+        raise ValueError(f"[JustGINCS] {path} was saved for board size {header['board_size']} "
+                         f"and winning length {header['winning_length']}");
+    return header;
+
+
+def read_log_header(path: str, buffer: bytes | memoryview = None) -> Dict[str, object]:
+    if buffer is None:
+        with open(path, 'rb') as file:
+            buffer = file.read(calcsize(log_header));
+    header = dict(zip(log_header_fields, unpack_from(log_header, buffer)));
+    if header['magic'] != log_magic or header['version'] != log_version:
+        raise ValueError(f'[JustGINCS] {path} is not a game log');
+    if (header['board_size'], header['winning_length'], header['item_count']) != (board_size, winning_length, len(available_items)):
+        raise ValueError(f"[JustGINCS] {path} was recorded for board size {header['board_size']} "
+                         f"and winning length {header['winning_length']}");
+    return header;
+
+
+def play_parallel_games(task: Tuple[int, int]) -> Tuple[List[List[bool | None]], List[Tuple[float, float, int]]]:
+    games_count, random_seed = task;
+    seed(random_seed);
+    board, players = parallel_state['board'], parallel_state['players'];
+    for bot, memory in zip(parallel_state['bots'], parallel_state['memories']):
+        bot.board.values = memory.buf[:len(bot.board.values) * bot.board.values.itemsize].cast(memoryview(bot.board.values).format);
+        bot.board.best_edges.clear();
+        bot.board.cache_best_edges = False;
+        bot.board.reset_deltas();
+    for player in players:
+        player.games_history = Games_History(None);
+    board.play_many(players, games_count, parallel_state['batch_size']);
+    [bot.backup() for bot in parallel_state['bots'] if bot.trace_decay is not None];
+    return ([list(player.games_history) for player in players],
+            [(bot.board.delta_max, bot.board.delta_sum, bot.board.delta_count) for bot in parallel_state['bots']]);
+
+
+def apply_snapshot(board: Board, snapshot: Tuple) -> None:
+    values = array('d');
+    values.frombytes(snapshot[-1]);
+    if snapshot[0] == 'values':
+        if len(values) != len(board.values):
+            raise ValueError(f'[JustGINCS] Snapshot of {len(values)} positions does not match a board of {len(board.values)}');
+        board.values[:] = values;
+    else:
+        columns = [array('Q') for _ in available_items];
+        [column.frombytes(column_bytes) for column, column_bytes in zip(columns, snapshot[1])];
+        for index, value in enumerate(values):
+            position = board.find_masks(tuple(column[index] for column in columns), expand=False);
+            if position is not None:
+                board.values[position.id] = value;
+    board.best_edges.clear();
+
+
+def run_worker(address: Tuple[str, int] | str, authkey: bytes, chunk_games: int = default_chunk_size) -> None:
+    from multiprocessing.connection import Client;
+    connection = Client(address, authkey=authkey);
+    try:
+        config = connection.recv();
+        set_board_size(config['board_size'], config['winning_length']);
+        seed(config['seed']);
+        board = Board(config['item'], config['lazy'], config['max_positions'], config['symmetric']);
+        board.position.search_positions() if not config['lazy'] else None;
+        bot = Snapshot_Bot(board, config['epsilon'], 0.0, config['item'], f"Worker bot ({config['item']})");
+        opponent_types = {player_type.__name__: player_type for player_type in (Randomer, Smart_Randomer, Perfect)};
+        opponents = [opponent_types[config['opponent']](board, item) for item in available_items if item != config['item']];
+        apply_snapshot(board, connection.recv());
+        while True:
+            while connection.poll():
+                message = connection.recv();
+                if message[0] == 'stop':
+                    return;
+                apply_snapshot(board, message);
+            log = Game_Log(file=BytesIO());
+            log.attach(board);
+            board.play_many([bot] + opponents, chunk_games);
+            log.detach(board);
+            connection.send_bytes(log.file.getvalue());
+    except (EOFError, OSError):
+        return;
+    finally:
+        connection.close();
+
+
+def get_initial_value(winning_item: str, winner_index: int) -> float:
+    return default_value if winner_index < 0 else win_value if available_items[winner_index] == winning_item else lose_value;
+
+
+def get_batch_best_edges(rng: Generator, values: NDArray, child_ids: NDArray, first: NDArray, counts: NDArray) -> NDArray:
+    import numpy;
+    total = int(counts.sum());
+    segment_starts = numpy.cumsum(counts) - counts;
+    edges = numpy.repeat(first - segment_starts, counts) + numpy.arange(total);
+    child_values = values[child_ids[edges]];
+    best_values = numpy.repeat(numpy.maximum.reduceat(child_values, segment_starts), counts);
+    keys = numpy.where(child_values == best_values, rng.random(total), -1.0);
+    best_keys = numpy.repeat(numpy.maximum.reduceat(keys, segment_starts), counts);
+    chosen = numpy.minimum.reduceat(numpy.where(keys == best_keys, numpy.arange(total), total), segment_starts);
+    return edges[chosen];
+
+
+def apply_batch_update(values: NDArray, position_ids: NDArray, targets: NDArray, alpha: float) -> Tuple[float, float, int]:
+    import numpy;
+    if position_ids.size < 1:
+        return 0.0, 0.0, 0;
+    deltas = alpha * numpy.abs(targets - values[position_ids]);
+    unique_ids, inverse, counts = numpy.unique(position_ids, return_inverse=True, return_counts=True);
+    mean_targets = numpy.bincount(inverse, weights=targets) / counts;
+    values[unique_ids] += (1.0 - (1.0 - alpha) ** counts) * (mean_targets - values[unique_ids]);
+    return float(deltas.max()), float(deltas.sum()), int(deltas.size);
+
+
+def to_key(masks: Tuple[int, ...]) -> int:
+    key = 0;
+    for index, mask in enumerate(masks):
+        key |= mask << (index * board_size * board_size);
+    return key;
+
+
+class Game_Graph:
+
+    symmetric: bool;
+    masks: List[array];
+    last_moves: array;
+    winners: array;
+    child_starts: array;
+    child_ends: array;
+    child_ids: array;
+    child_symmetries: array;
+    ids_cache: Dict[int, int] | None;
+    parent_index: Tuple[array, array, array] | None;
+    indexed_edges: int;
+    terminals_cache: array | None;
+    win_edges_cache: array | None;
+    initial_values: Dict[str, array];
+    value_tables: List[Tuple[ref, str]];
+    perfect_edges: array | None;
+    compactions: int;
+
+    def __init__(self, symmetric: bool = False) -> None:
+        self.symmetric = symmetric;
+        self.masks = [array('Q') for _ in available_items];
+        self.last_moves = array('b');
+        self.winners = array('b');
+        self.child_starts = array('l');
+        self.child_ends = array('l');
+        self.child_ids = array('l');
+        self.child_symmetries = array('b');
+        self.ids_cache = dict();
+        self.parent_index = None;
+        self.indexed_edges = 0;
+        self.terminals_cache = array('b');
+        self.win_edges_cache = array('l');
+        self.initial_values = dict();
+        self.value_tables = list();
+        self.perfect_edges = None;
+        self.compactions = 0;
+
+    def __len__(self) -> int:
+        return len(self.last_moves);
+
+    @property
+    def ids(self) -> Dict[int, int]:
+        if self.ids_cache is None:
+            self.ids_cache = {to_key(self.get_masks(position_id)): position_id for position_id in range(0, len(self))};
+        return self.ids_cache;
+
+    @property
+    def terminals(self) -> array:
+        if self.terminals_cache is None:
+            self.terminals_cache = array('b', (self.is_terminal(self.get_masks(position_id), self.winners[position_id])
+                                               for position_id in range(0, len(self))));
+        return self.terminals_cache;
+
+    @property
+    def win_edges(self) -> array:
+        if self.win_edges_cache is None:
+            self.win_edges_cache = array('l', (self.find_win_edge(position_id) for position_id in range(0, len(self))));
+        return self.win_edges_cache;
+
+    @staticmethod
+    def is_terminal(masks: Tuple[int, ...], winner_index: int) -> bool:
+        occupied = 0;
+        for mask in masks:
+            occupied |= mask;
+        return winner_index >= 0 or occupied.bit_count() == board_size * board_size;
+
+    def find_win_edge(self, position_id: int) -> int:
+        if self.child_starts[position_id] < 0:
+            return -1;
+        return next((edge for edge in range(self.child_starts[position_id], self.child_ends[position_id])
+                     if self.winners[self.child_ids[edge]] >= 0), -1);
+
+    def index_parents(self) -> Tuple[array, array, array]:
+        edges_count = len(self.child_ids);
+        positions_count = len(self);
+        parent_starts = array('l', [0]) * (positions_count + 1);
+        for child_id in self.child_ids[:edges_count]:
+            parent_starts[child_id + 1] += 1;
+        for position_id in range(0, positions_count):
+            parent_starts[position_id + 1] += parent_starts[position_id];
+        parent_ids = array('l', [0]) * edges_count;
+        parent_edges = array('l', [0]) * edges_count;
+        slots = parent_starts[:-1];
+        for parent_id in range(0, positions_count):
+            for edge in range(self.child_starts[parent_id], min(self.child_ends[parent_id], edges_count)):
+                child_id = self.child_ids[edge];
+                parent_ids[slots[child_id]] = parent_id;
+                parent_edges[slots[child_id]] = edge;
+                slots[child_id] += 1;
+        self.parent_index = (parent_starts, parent_ids, parent_edges);
+        self.indexed_edges = edges_count;
+        return self.parent_index;
+
+    def get_parent_index(self) -> Tuple[array, array, array]:
+        parent_index = self.parent_index;
+        if parent_index is None or len(self.child_ids) > 2 * self.indexed_edges + default_chunk_size:
+            parent_index = self.index_parents();
+        return parent_index;
+
+    def add(self, masks: Tuple[int, ...], last_move: int = None) -> int:
+        new_id = len(self.last_moves);
+        winner = get_line_table().get_winner(masks, last_move);
+        winner_index = -1 if winner is None else available_items.index(winner);
+        [self.masks[index].append(mask) for index, mask in enumerate(masks)];
+        self.last_moves.append(-1 if last_move is None else last_move);
+        self.winners.append(winner_index);
+        self.child_starts.append(-1);
+        self.child_ends.append(-1);
+        self.ids[to_key(masks)] = new_id;
+        self.terminals_cache.append(self.is_terminal(masks, winner_index)) if self.terminals_cache is not None else None;
+        self.win_edges_cache.append(-1) if self.win_edges_cache is not None else None;
+        [values.append(get_initial_value(item, winner_index)) for item, values in self.initial_values.items()];
+        for table_ref, item in self.value_tables:
+            values = table_ref();
+            values.append(get_initial_value(item, winner_index)) if values is not None else None;
+        return new_id;
+
+    def get_initial_values(self, winning_item: str) -> array:
+        if winning_item not in self.initial_values:
+            self.initial_values[winning_item] = array('d', (get_initial_value(winning_item, winner) for winner in self.winners));
+        return self.initial_values[winning_item];
+
+    def new_values(self, winning_item: str) -> array:
+        return self.register_values(self.get_initial_values(winning_item)[:], winning_item);
+
+    def register_values(self, values: array, winning_item: str) -> array:
+        self.value_tables = [(table_ref, item) for table_ref, item in self.value_tables if table_ref() is not None];
+        self.value_tables.append((ref(values), winning_item));
+        return values;
+
+    def get_masks(self, position_id: int) -> Tuple[int, ...]:
+        return tuple(masks[position_id] for masks in self.masks);
+
+    def get_children(self, position_id: int) -> array:
+        return self.child_ids[self.child_starts[position_id]:self.child_ends[position_id]];
+
+    def get_children_count(self, position_id: int) -> int:
+        return self.child_ends[position_id] - self.child_starts[position_id];
+
+    def expand(self, position_id: int, item_index: int = None) -> List[int]:
+        if self.child_starts[position_id] >= 0:
+            return list();
+        masks = self.get_masks(position_id);
+        self.child_starts[position_id] = len(self.child_ids);
+        if self.winners[position_id] >= 0:
+            self.child_ends[position_id] = len(self.child_ids);
+            return list();
+        occupied = 0;
+        for mask in masks:
+            occupied |= mask;
+        item_index = occupied.bit_count() % len(available_items) if item_index is None else item_index;
+        symmetry_table = get_symmetry_table() if self.symmetric else None;
+        new_ids: List[int] = list();
+        for index in range(0, board_size * board_size):
+            if occupied >> index & 1:
+                continue;
+            new_masks = tuple(mask | 1 << index if i == item_index else mask for i, mask in enumerate(masks));
+            move, symmetry = index, 0;
+            if symmetry_table is not None:
+                new_masks, canonical_symmetry = symmetry_table.canonize(new_masks);
+                move = symmetry_table.permutations[canonical_symmetry][index];
+                symmetry = symmetry_table.inverse[canonical_symmetry];
+            child_id = self.ids.get(to_key(new_masks));
+            if child_id is None:
+                child_id = self.add(new_masks, move);
+                new_ids.append(child_id);
+            self.child_ids.append(child_id);
+            self.child_symmetries.append(symmetry);
+        self.child_ends[position_id] = len(self.child_ids);
+        if self.win_edges_cache is not None:
+            self.win_edges_cache[position_id] = self.find_win_edge(position_id);
+        return new_ids;
+
+    def solve(self) -> array:
+        if self.perfect_edges is not None and len(self.perfect_edges) == len(self):
+            return self.perfect_edges;
+        unknown = perfect_score + 1;
+        scores = array('h', [unknown]) * len(self);
+        edges = array('l', [-1]) * len(self);
+        for root_id in range(0, len(self)):
+            stack: List[int] = [root_id];
+            while len(stack) > 0:
+                position_id = stack[-1];
+                if scores[position_id] != unknown:
+                    stack.pop();
+                    continue;
+                start, end = self.child_starts[position_id], self.child_ends[position_id];
+                if self.winners[position_id] >= 0 or end - start < 1:
+                    scores[position_id] = -perfect_score if self.winners[position_id] >= 0 else 0;
+                    stack.pop();
+                    continue;
+                pending = [child_id for child_id in self.child_ids[start:end] if scores[child_id] == unknown];
+                if len(pending) > 0:
+                    stack.extend(pending);
+                    continue;
+                child_scores = [-scores[child_id] for child_id in self.child_ids[start:end]];
+                best_score = max(child_scores);
+                edges[position_id] = choice([start + index for index, score in enumerate(child_scores) if score == best_score]);
+                scores[position_id] = best_score - 1 if best_score > 0 else best_score + 1 if best_score < 0 else 0;
+                stack.pop();
+        self.perfect_edges = edges;
+        return edges;
+
+    def get_live_values(self) -> List[array]:
+        return [values for values in (table_ref() for table_ref, _ in self.value_tables) if values is not None];
+
+    def compact(self, keep_ids: List[int]) -> None:
+        self.masks = [array('Q', (masks[position_id] for position_id in keep_ids)) for masks in self.masks];
+        self.last_moves = array('b', (self.last_moves[position_id] for position_id in keep_ids));
+        self.winners = array('b', (self.winners[position_id] for position_id in keep_ids));
+        self.child_starts = array('l', [-1]) * len(keep_ids);
+        self.child_ends = array('l', [-1]) * len(keep_ids);
+        self.child_ids = array('l');
+        self.child_symmetries = array('b');
+        self.ids_cache = None;
+        self.parent_index = None;
+        self.indexed_edges = 0;
+        self.terminals_cache = None;
+        self.win_edges_cache = None;
+        self.perfect_edges = None;
+        self.compactions += 1;
+        for values in list(self.initial_values.values()) + self.get_live_values():
+            values[:] = array('d', (values[position_id] for position_id in keep_ids));
+
+    def shrink(self, max_positions: int) -> None:
+        tables = self.get_live_values();
+        deviations = [(max(abs(values[position_id] - default_value) for values in tables), position_id)
+                      for position_id in range(1, len(self)) if self.winners[position_id] < 0];
+        learned = sorted((deviation for deviation in deviations if deviation[0] > 0), reverse=True);
+        self.compact([0] + [position_id for _, position_id in learned[:max_positions // 2]]);
+
+    def get_bytes(self) -> int:
+        return sum(masks.itemsize * len(masks) for masks in self.masks) + sum(
+            column.itemsize * len(column) for column in
+            (self.last_moves, self.winners, self.child_starts, self.child_ends, self.child_ids, self.child_symmetries));
+
+
+class Positions_View(Mapping):
+
+    board: Board;
+
+    def __init__(self, board: Board) -> None:
+        self.board = board;
+
+    def __getitem__(self, key: int) -> Position:
+        return Position(self.board, self.board.graph.ids[key]);
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.board.graph.ids;
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.board.graph.ids);
+
+    def __len__(self) -> int:
+        return len(self.board.graph);
+
+
+class Play_Stats:
+
+    timing: bool;
+    timers: Dict[str, float];
+    counters: Dict[str, int];
+    hooks: Dict[str, List[Callable]];
+
+    def __init__(self, timing: bool = True) -> None:
+        self.timing = timing;
+        self.hooks = dict();
+        self.clear();
+
+    def clear(self) -> None:
+        self.timers = dict();
+        self.counters = dict();
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.timers[phase] = self.timers.get(phase, 0.0) + seconds;
+
+    def count(self, counter: str, value: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + value;
+
+    def add_hook(self, event: str, callback: Callable) -> None:
+        self.hooks.setdefault(event, list()).append(callback);
+
+    def remove_hook(self, event: str, callback: Callable) -> None:
+        self.hooks.get(event, list()).remove(callback);
+
+    def has_hooks(self) -> bool:
+        return any(len(callbacks) > 0 for callbacks in self.hooks.values());
+
+    def emit(self, event: str, *arguments) -> None:
+        [callback(*arguments) for callback in self.hooks.get(event, list())];
+
+    def get_summary(self) -> Dict[str, object]:
+        moves = max(self.counters.get('moves', 0), 1);
+        return {'timers': dict(self.timers), 'counters': dict(self.counters),
+                'microseconds_per_move': {phase: seconds * 1e6 / moves for phase, seconds in self.timers.items()}};
+
+    def print_summary(self) -> None:
+        summary = self.get_summary();
+        print('[JustGINCS] Play statistics:');
+        [print(f'  {counter}: {value}') for counter, value in summary['counters'].items()];
+        [print(f"  {phase}: {seconds:.4f}s ({summary['microseconds_per_move'][phase]:.2f} us/move)")
+         for phase, seconds in summary['timers'].items()];
+
+
+class Convergence:
+
+    max_delta: float | None;
+    mean_delta: float | None;
+    win_rate_delta: float | None;
+    patience: int;
+    check_games: int;
+    min_games: int;
+    games_played: int;
+    streak: int;
+    converged: bool;
+    history: List[Dict[str, float]];
+    boards: List[Board];
+    wins: Dict[Player, int];
+    win_rates: Dict[Player, float];
+
+    def __init__(self, max_delta: float = None, mean_delta: float = default_mean_delta, win_rate_delta: float = default_win_rate_delta,
+                 patience: int = default_patience, check_games: int = default_chunk_size, min_games: int = 0) -> None:
+        self.max_delta = max_delta;
+        self.mean_delta = mean_delta;
+        self.win_rate_delta = win_rate_delta;
+        self.patience = patience;
+        self.check_games = check_games;
+        self.min_games = min_games;
+        self.start(list());
+
+    def start(self, players: List[Player]) -> None:
+        self.games_played = 0;
+        self.streak = 0;
+        self.converged = False;
+        self.history = list();
+        self.boards = list({id(player.board): player.board for player in players if isinstance(player, Bot)}.values());
+        [board.reset_deltas() for board in self.boards];
+        self.wins = {player: player.games_history.count(True) for player in players};
+        self.win_rates = dict();
+
+    def update(self, players: List[Player], games_count: int) -> bool:
+        self.games_played += games_count;
+        max_delta, mean_delta = 0.0, 0.0;
+        for board in self.boards:
+            max_delta = max(max_delta, board.delta_max);
+            mean_delta = max(mean_delta, board.delta_sum / max(board.delta_count, 1));
+            board.reset_deltas();
+        win_rates = {player: (player.games_history.count(True) - self.wins.get(player, 0)) / max(games_count, 1) for player in players};
+        win_rate_delta = max((abs(win_rate - self.win_rates[player]) for player, win_rate in win_rates.items() if player in self.win_rates),
+                             default=float('inf'));
+        self.wins = {player: player.games_history.count(True) for player in players};
+        self.win_rates = win_rates;
+        self.history.append({'games': self.games_played, 'max_delta': max_delta, 'mean_delta': mean_delta,
+                             'win_rate_delta': win_rate_delta});
+        met = all(threshold is None or delta <= threshold for threshold, delta in (
+            (self.max_delta, max_delta), (self.mean_delta, mean_delta), (self.win_rate_delta, win_rate_delta)));
+        self.streak = self.streak + 1 if met else 0;
+        self.converged = self.streak >= self.patience and self.games_played >= self.min_games;
+        return self.converged;
+
+
+class Training_Job:
+
+    name: str;
+    board: Board;
+    players: List[Player];
+    games_count: int;
+    batch_size: int | None;
+    chunk_size: int;
+    convergence: Convergence | None;
+    played: int;
+    started: float | None;
+    finished: float | None;
+    error: Exception | None;
+    cancel_event: Event;
+    thread: Thread;
+
+    def __init__(self, name: str, board: Board, players: List[Player], games_count: int, batch_size: int = None,
+                 chunk_size: int = default_chunk_size, convergence: Convergence = None) -> None:
+        self.name = name;
+        self.board = board;
+        self.players = players;
+        self.games_count = games_count;
+        self.batch_size = batch_size;
+        self.chunk_size = chunk_size if batch_size is None else batch_size;
+        self.convergence = convergence;
+        self.played = 0;
+        self.started = None;
+        self.finished = None;
+        self.error = None;
+        self.cancel_event = Event();
+        self.thread = Thread(target=self.run, name=name, daemon=True);
+
+    def start(self) -> Training_Job:
+        self.started = perf_counter();
+        self.thread.start();
+        return self;
+
+    def run(self) -> None:
+        try:
+            self.convergence.start(self.players) if self.convergence is not None else None;
+            while self.played < self.games_count and not self.cancel_event.is_set():
+                count = min(self.chunk_size, self.games_count - self.played);
+                self.board.play_many(self.players, count, self.batch_size);
+                self.played += count;
+                if self.convergence is not None and self.convergence.update(self.players, count):
+                    break;
+        except Exception as error:
+            self.error = error;
+        finally:
+            self.finished = perf_counter();
+
+    def cancel(self, wait: bool = True) -> None:
+        self.cancel_event.set();
+        self.thread.join() if wait and self.thread.is_alive() else None;
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread.is_alive();
+
+    def get_games_per_sec(self) -> float:
+        if self.started is None:
+            return 0.0;
+        return self.played / max((perf_counter() if self.finished is None else self.finished) - self.started, 1e-9);
+
+    def get_status(self) -> str:
+        converged = self.convergence is not None and self.convergence.converged;
+        state = 'running' if self.is_running else f'failed: {self.error}' if self.error is not None else (
+            'cancelled' if self.cancel_event.is_set() else 'converged' if converged else 'finished');
+        return (f'[JustGINCS] {self.name}: {self.played}/{self.games_count} games '
+                f'({100 * self.played / max(self.games_count, 1):.0f}%), {self.get_games_per_sec():.0f} games/sec, {state}');
+
+
 class Board:
 
-    all_positions: Dict[str, Position];
+    graph: Game_Graph;
+    values: array;
+    all_positions: Positions_View;
     position: Position;
     starting_position: Position;
     winning_item: str;
+    lazy: bool;
+    max_positions: int | None;
+    symmetric: bool;
+    pristine_values: array | None;
+    best_edges: Dict[int, Tuple[float, List[int]]];
+    best_edges_compactions: int;
+    cache_best_edges: bool;
+    resets: int;
+    delta_max: float;
+    delta_sum: float;
+    delta_count: int;
+    stats: Play_Stats | None;
 
-    def __init__(self,  winning_item: str = 'x') -> None:
-        self.starting_position = Position(self, [whitespace for _ in range(0, board_size * board_size)]);
-        self.all_positions = dict();
-        self.all_positions[self.starting_position.to_string()] = self.starting_position;
-        self.position = self.starting_position;
+    def __init__(self,  winning_item: str = 'x', lazy: bool = False, max_positions: int = None, symmetric: bool = False,
+                 graph: Game_Graph = None, values: array = None) -> None:
         self.winning_item = winning_item;
+        self.lazy = lazy;
+        self.max_positions = max_positions;
+        self.graph = Game_Graph(symmetric) if graph is None else graph;
+        self.symmetric = self.graph.symmetric;
+        self.values = self.graph.new_values(winning_item) if values is None else values;
+        self.pristine_values = None;
+        self.best_edges = dict();
+        self.best_edges_compactions = self.graph.compactions;
+        self.cache_best_edges = True;
+        self.resets = 0;
+        self.reset_deltas();
+        self.stats = None;
+        self.starting_position = Position(self, 0 if len(self.graph) > 0 else self.graph.add(tuple(0 for _ in available_items)));
+        self.all_positions = Positions_View(self);
+        self.position = self.starting_position;
+
+    def expand(self, position_id: int, item_index: int = None) -> List[int]:
+        return self.graph.expand(position_id, item_index);
+
+    def enable_stats(self, timing: bool = True) -> Play_Stats:
+        self.stats = Play_Stats(timing) if self.stats is None else self.stats;
+        self.stats.timing = self.stats.timing or timing;
+        return self.stats;
+
+    def disable_stats(self) -> None:
+        self.stats = None;
+
+    def has_hooks(self) -> bool:
+        return self.stats is not None and self.stats.has_hooks();
+
+    def reset(self) -> None:
+        initial_values = self.graph.get_initial_values(self.winning_item);
+        values_format = memoryview(self.values).format;
+        if values_format != initial_values.typecode:
+            if self.pristine_values is None or len(self.pristine_values) != len(initial_values):
+                self.pristine_values = array(values_format, initial_values);
+            initial_values = self.pristine_values;
+        memoryview(self.values)[:] = memoryview(initial_values);
+        self.best_edges.clear();
+        self.resets += 1;
+        self.position = self.starting_position;
+
+    def save(self, path: str, alfa: float = default_alpha, epsilon: float = default_epsilon) -> None:
+        graph = self.graph;
+        columns = [array('Q', masks) for masks in graph.masks] + [
+            array('b', graph.last_moves), array('b', graph.winners), array('q', graph.child_starts), array('q', graph.child_ends),
+            array('q', graph.child_ids), array('b', graph.child_symmetries), array('f', self.values)];
+        with open(path, 'wb') as file:
+            file.write(pack(file_header, file_magic, file_version, board_size, winning_length, len(available_items),
+                            available_items.index(self.winning_item), graph.symmetric, self.lazy, alfa, epsilon,
+                            len(graph), len(graph.child_ids)));
+            for column in columns:
+                file.write(bytes(-file.tell() % 8));
+                file.write(column.tobytes());
+
+    @staticmethod
+    def load(path: str, writable: bool = True, lazy: bool = None, max_positions: int = None) -> Board:
+        header = read_header(path);
+        lazy = bool(header['lazy']) if lazy is None else lazy;
+        positions_count, edges_count = header['positions_count'], header['edges_count'];
+        with open(path, 'rb') as file:
+            buffer = memoryview(mmap(file.fileno(), 0, access=ACCESS_COPY if writable else ACCESS_READ));
+        offset = calcsize(file_header);
+        columns: List[memoryview] = list();
+        for typecode, count in [('Q', positions_count) for _ in available_items] + [
+                ('b', positions_count), ('b', positions_count), ('q', positions_count), ('q', positions_count),
+                ('q', edges_count), ('b', edges_count), ('f', positions_count)]:
+            offset += -offset % 8;
+            columns.append(buffer[offset:offset + count * calcsize(typecode)].cast(typecode));
+            offset += count * calcsize(typecode);
+        if lazy:
+            columns = [array('Q', column) for column in columns[:len(available_items)]] + [
+                array(typecode, column) for typecode, column in zip(['b', 'b', 'l', 'l', 'l', 'b', 'd'], columns[len(available_items):])];
+        graph = Game_Graph(bool(header['symmetric']));
+        graph.masks = columns[:len(available_items)];
+        (graph.last_moves, graph.winners, graph.child_starts, graph.child_ends, graph.child_ids, graph.child_symmetries,
+         values) = columns[len(available_items):];
+        graph.ids_cache = None;
+        graph.terminals_cache = None;
+        graph.win_edges_cache = None;
+        winning_item = available_items[header['winning_item']];
+        graph.register_values(values, winning_item) if lazy else None;
+        return Board(winning_item, lazy, max_positions, graph=graph, values=values);
+
+    def find_position(self, position: Position) -> Position | None:
+        if position.board is self:
+            return position;
+        if position.board.graph is self.graph:
+            return Position(self, position.id, position.symmetry);
+        return self.find_masks(position.masks, position.last_move);
+
+    def find_masks(self, masks: Tuple[int, ...], last_move: int = None, expand: bool = True) -> Position | None:
+        symmetry = 0;
+        if self.symmetric:
+            symmetry_table = get_symmetry_table();
+            masks, canonical_symmetry = symmetry_table.canonize(masks);
+            last_move = None if last_move is None else symmetry_table.permutations[canonical_symmetry][last_move];
+            symmetry = symmetry_table.inverse[canonical_symmetry];
+        position_id = self.graph.ids.get(to_key(masks));
+        if position_id is None:
+            if not self.lazy or not expand:
+                return None;
+            position_id = self.graph.add(masks, last_move);
+        if self.lazy and expand:
+            self.expand(position_id);
+        return Position(self, position_id, symmetry);
+
+    def sync_best_edges(self) -> None:
+        if self.best_edges_compactions != self.graph.compactions:
+            self.best_edges.clear();
+            self.best_edges_compactions = self.graph.compactions;
+
+    def reset_deltas(self) -> None:
+        self.delta_max, self.delta_sum, self.delta_count = 0.0, 0.0, 0;
+
+    def add_deltas(self, delta_max: float, delta_sum: float, delta_count: int) -> None:
+        self.delta_max = max(self.delta_max, delta_max);
+        self.delta_sum += delta_sum;
+        self.delta_count += delta_count;
+
+    def set_value(self, position_id: int, value: float) -> None:
+        delta = abs(value - self.values[position_id]);
+        self.delta_max = delta if delta > self.delta_max else self.delta_max;
+        self.delta_sum += delta;
+        self.delta_count += 1;
+        self.values[position_id] = value;
+        if not self.cache_best_edges:
+            return;
+        value = self.values[position_id];
+        best_edges, graph = self.best_edges, self.graph;
+        parent_starts, parent_ids, parent_edges = graph.get_parent_index();
+        for slot in range(parent_starts[position_id], parent_starts[position_id + 1]) if position_id + 1 < len(parent_starts) else ():
+            parent_id, edge = parent_ids[slot], parent_edges[slot];
+            cached = best_edges.get(parent_id);
+            if cached is None:
+                continue;
+            if value > cached[0]:
+                best_edges[parent_id] = (value, [edge]);
+            elif value == cached[0]:
+                cached[1].append(edge) if edge not in cached[1] else None;
+            elif edge in cached[1]:
+                cached[1].remove(edge);
+                if len(cached[1]) < 1:
+                    del best_edges[parent_id];
+
+    def shrink(self) -> None:
+        self.graph.shrink(self.max_positions);
+        self.sync_best_edges();
+        self.starting_position = Position(self, 0);
+        self.position = self.starting_position;
 
     def print(self) -> None:
         [print(f' {cell} ', end='' if (index + 1) % board_size else "\n")
          for index, cell in enumerate(self.position.items)];
 
     def reverse_winner(self) -> None:
-        for position in self.all_positions.values():
-            winner = position.get_winner();
-            position.value = 1.0 if winner == self.winning_item else 0.0 if winner is not None else position.value;
+        for position_id, winner_index in enumerate(self.graph.winners):
+            if winner_index >= 0:
+                self.values[position_id] = get_initial_value(self.winning_item, winner_index);
+        self.best_edges.clear();
 
     def play(self, players: List[Player], verbose: bool = False) -> None:
-        self.position = self.starting_position;
         sorted_players = [next(player for player in players if player.item == item) for item in available_items];
-        [player.new_game() for player in sorted_players if player is Bot];
+        [player.new_game() for player in sorted_players if isinstance(player, Bot)];
+        if self.lazy and self.max_positions is not None and len(self.graph) > self.max_positions:
+            [player.backup() for player in sorted_players if isinstance(player, Bot) and player.board.graph is self.graph];
+            self.shrink();
+        [board.sync_best_edges() for board in [self] + [player.board for player in sorted_players if isinstance(player, (Bot, Frozen_Bot))]];
+        self.position = self.starting_position;
+        graph = self.graph;
+        stats = self.stats;
+        timed = stats is not None and stats.timing;
+        stats.emit('game_start', self, sorted_players) if stats is not None else None;
         player_index: int = 0;
         while True:
             player = sorted_players[player_index];
             player_index = (player_index + 1) % len(sorted_players);
-            if self.position.next_positions is None or len(self.position.next_positions) < 1:
+            started = perf_counter() if timed else 0.0;
+            if self.lazy and graph.child_starts[self.position.id] < 0:
+                self.expand(self.position.id);
+                stats.count('expansions') if stats is not None else None;
+            start, end = graph.child_starts[self.position.id], graph.child_ends[self.position.id];
+            if end - start < 1:
                 winner = self.position.get_winner();
                 [player.fix_game(None if winner is None else winner == player.item) for player in sorted_players];
+                if stats is not None:
+                    stats.add_time('terminal', perf_counter() - started) if timed else None;
+                    stats.count('games');
+                    stats.emit('game_end', self, sorted_players, winner);
                 return;
+            if timed:
+                stats.add_time('terminal', perf_counter() - started);
+                started = perf_counter();
             next_move = player.get_move(self);
-            if next_move.to_string() not in self.position.next_positions:
+            if timed:
+                stats.add_time('get_move', perf_counter() - started);
+                started = perf_counter();
+            if next_move.board is not self:
+                next_move = self.find_position(next_move);
+                stats.count('cross_board_moves') if stats is not None else None;
+            if next_move is None or next_move.id not in graph.child_ids[start:end] or (self.symmetric and not any(
+                    graph.child_ids[edge] == next_move.id and self.position.get_child(edge).key == next_move.key
+                    for edge in range(start, end))):
                 print('[JustGINCS] Something gone wrong 🤡');
                 return;
             self.position = next_move;
+            if stats is not None:
+                stats.add_time('check', perf_counter() - started) if timed else None;
+                stats.count('moves');
+                stats.emit('move', self, player, next_move);
             print(f"Move of {player.name}:") if verbose and player is not Human else None;
             self.print() if verbose else None;
 
-    def play_many(self, players: List[Player], games_count: int = 1000) -> None:
-        [self.play(players) for _ in range(0, games_count)]
+    def play_many(self, players: List[Player], games_count: int = 1000, batch_size: int = None, processes: int = None,
+                  convergence: Convergence = None) -> int:
+        if convergence is not None:
+            convergence.start(players);
+            while convergence.games_played < games_count and not convergence.converged:
+                count = min(convergence.check_games, games_count - convergence.games_played);
+                self.play_many(players, count, batch_size, processes);
+                convergence.update(players, count);
+            self.stats.count('converged_runs') if self.stats is not None and convergence.converged else None;
+            return convergence.games_played;
+        started = perf_counter();
+        if processes is not None and processes > 1 and self.can_play_parallel(players):
+            self.play_parallel(players, games_count, processes, batch_size);
+            self.stats.count('parallel_games', games_count) if self.stats is not None else None;
+        elif batch_size is not None and self.can_play_batch(players):
+            self.play_batch(players, games_count, batch_size);
+            self.stats.count('batch_games', games_count) if self.stats is not None else None;
+        else:
+            [self.play(players) for _ in range(0, games_count)];
+        self.stats.add_time('play_many', perf_counter() - started) if self.stats is not None and self.stats.timing else None;
+        return games_count;
+
+    def can_play_parallel(self, players: List[Player]) -> bool:
+        from multiprocessing import get_all_start_methods;
+        return not self.lazy and 'fork' in get_all_start_methods() and not self.has_hooks() and not any(isinstance(player, Human) for player in players) and all(
+            player.board.graph is self.graph for player in players if isinstance(player, Bot));
+
+    def play_parallel(self, players: List[Player], games_count: int = 1000, processes: int = 2, batch_size: int = None) -> None:
+        from multiprocessing import get_context;
+        from multiprocessing.shared_memory import SharedMemory;
+        bots = [player for player in players if isinstance(player, Bot)];
+        memories = [SharedMemory(create=True, size=max(len(bot.board.values), 1) * bot.board.values.itemsize) for bot in bots];
+        try:
+            for bot, memory in zip(bots, memories):
+                memory.buf[:len(bot.board.values) * bot.board.values.itemsize] = memoryview(bot.board.values).cast('B');
+            parallel_state.update(board=self, players=players, bots=bots, memories=memories, batch_size=batch_size);
+            tasks = [(games_count // processes + (1 if index < games_count % processes else 0), getrandbits(64))
+                     for index in range(0, processes)];
+            with get_context('fork').Pool(processes) as pool:
+                results = pool.map(play_parallel_games, tasks);
+            for histories, deltas in results:
+                for player, history in zip(players, histories):
+                    [player.fix_game(winner) for winner in history];
+                [bot.board.add_deltas(*bot_deltas) for bot, bot_deltas in zip(bots, deltas)];
+            for bot, memory in zip(bots, memories):
+                memoryview(bot.board.values).cast('B')[:] = memory.buf[:len(bot.board.values) * bot.board.values.itemsize];
+                bot.board.best_edges.clear();
+        finally:
+            parallel_state.clear();
+            for memory in memories:
+                memory.close();
+                memory.unlink();
+
+    def can_play_batch(self, players: List[Player]) -> bool:
+        return not self.lazy and not self.has_hooks() and find_spec('numpy') is not None and all(
+            type(player) is Randomer or (isinstance(player, Bot) and player.board.graph is self.graph) or (
+                isinstance(player, Frozen_Bot) and player.covers(self.graph)) for player in players);
+
+    def play_batch(self, players: List[Player], games_count: int = 1000, batch_size: int = default_batch_size) -> None:
+        import numpy;
+        graph = self.graph;
+        sorted_players = [next(player for player in players if player.item == item) for item in available_items];
+        bots = [player for player in sorted_players if isinstance(player, Bot)];
+        [bot.new_game() for bot in bots];
+        rng = numpy.random.default_rng(getrandbits(64));
+        starts = numpy.frombuffer(graph.child_starts, dtype=f'i{graph.child_starts.itemsize}');
+        ends = numpy.frombuffer(graph.child_ends, dtype=f'i{graph.child_ends.itemsize}');
+        child_ids = numpy.frombuffer(graph.child_ids, dtype=f'i{graph.child_ids.itemsize}');
+        winners = numpy.frombuffer(graph.winners, dtype=numpy.int8);
+        values = {bot: numpy.frombuffer(bot.board.values, dtype=f'f{bot.board.values.itemsize}') for bot in bots};
+        policies = {player: tuple(numpy.frombuffer(column, dtype=f'i{column.itemsize}')
+                                  for column in (player.policy_starts, player.policy_ends, player.policy_edges))
+                    for player in sorted_players if isinstance(player, Frozen_Bot)};
+        played = 0;
+        while played < games_count:
+            count = min(batch_size, games_count - played);
+            positions = numpy.full(count, self.starting_position.id, dtype=numpy.int64);
+            last_moves = {bot: numpy.full(count, -1, dtype=numpy.int64) for bot in bots};
+            trajectories = {bot: list() for bot in bots if bot.trace_decay is not None};
+            active = numpy.arange(count);
+            player_index = 0;
+            while active.size > 0:
+                player = sorted_players[player_index];
+                player_index = (player_index + 1) % len(sorted_players);
+                first = starts[positions[active]];
+                counts = ends[positions[active]] - first;
+                alive = counts > 0;
+                active, first, counts = active[alive], first[alive], counts[alive];
+                if active.size < 1:
+                    break;
+                if player in policies:
+                    policy_starts, policy_ends, policy_edges = policies[player];
+                    policy_first = policy_starts[positions[active]];
+                    edges = policy_edges[policy_first + (rng.random(active.size) * (
+                        policy_ends[positions[active]] - policy_first)).astype(numpy.int64)];
+                else:
+                    edges = first + (rng.random(active.size) * counts).astype(numpy.int64);
+                if player in values:
+                    greedy = numpy.flatnonzero(rng.random(active.size) > player.epsilon);
+                    if greedy.size > 0:
+                        edges[greedy] = get_batch_best_edges(rng, values[player], child_ids, first[greedy], counts[greedy]);
+                moves = child_ids[edges];
+                if player in trajectories:
+                    trajectories[player].append((active, moves));
+                elif player in values:
+                    last = last_moves[player][active];
+                    updated = last >= 0;
+                    player.board.add_deltas(*apply_batch_update(values[player], last[updated], values[player][moves[updated]], player.alfa));
+                    last_moves[player][active] = moves;
+                positions[active] = moves;
+            final_winners = winners[positions];
+            for bot, steps in trajectories.items():
+                item_index = available_items.index(bot.item);
+                later_targets = numpy.where(final_winners < 0, draw_value, numpy.where(final_winners == item_index, win_value, lose_value));
+                later_values = numpy.full(count, numpy.nan);
+                for games, moves in reversed(steps):
+                    targets = numpy.where(numpy.isnan(later_values[games]), later_targets[games],
+                                          (1.0 - bot.trace_decay) * later_values[games] + bot.trace_decay * later_targets[games]);
+                    later_values[games] = values[bot][moves];
+                    later_targets[games] = targets;
+                    bot.board.add_deltas(*apply_batch_update(values[bot], moves, targets, bot.alfa));
+            outcomes = final_winners.tolist();
+            for player in sorted_players:
+                item_index = available_items.index(player.item);
+                [player.fix_game(None if winner < 0 else winner == item_index) for winner in outcomes];
+            played += count;
+        [bot.board.best_edges.clear() for bot in bots];
 
 
 class Position:
 
-    items: List[str];
+    __slots__ = ('board', 'id', 'symmetry');
     board: Board;
-    value: float;
-    next_positions: Dict[str, Position];
+    id: int;
+    symmetry: int;
 
-    def __init__(self, board: Board, items: List[str], value: float = None, next_positions: Dict[str, Position] = None) -> None:
-        self.items = items;
+    def __init__(self, board: Board, position_id: int, symmetry: int = 0) -> None:
         self.board = board;
-        self.value = value;
-        self.next_positions = next_positions;
+        self.id = position_id;
+        self.symmetry = symmetry;
+
+    @property
+    def masks(self) -> Tuple[int, ...]:
+        masks = self.board.graph.get_masks(self.id);
+        if self.symmetry == 0:
+            return masks;
+        symmetry_table = get_symmetry_table();
+        return tuple(symmetry_table.apply(self.symmetry, mask) for mask in masks);
+
+    @property
+    def key(self) -> int:
+        return to_key(self.masks);
+
+    @property
+    def last_move(self) -> int | None:
+        last_move = self.board.graph.last_moves[self.id];
+        if last_move < 0:
+            return None;
+        return last_move if self.symmetry == 0 else get_symmetry_table().permutations[self.symmetry][last_move];
+
+    @property
+    def value(self) -> float:
+        return self.board.values[self.id];
+
+    @value.setter
+    def value(self, new_value: float) -> None:
+        self.board.set_value(self.id, new_value);
+
+    @property
+    def next_positions(self) -> Dict[int, Position] | None:
+        if self.board.graph.get_children_count(self.id) < 1:
+            return None;
+        return {position.key: position for position in self.get_next_positions()};
+
+    @property
+    def items(self) -> List[str]:
+        items = [whitespace for _ in range(0, board_size * board_size)];
+        for item, mask in zip(available_items, self.masks):
+            for index in range(0, board_size * board_size):
+                if mask >> index & 1:
+                    items[index] = item;
+        return items;
+
+    def get_child(self, edge: int) -> Position:
+        graph = self.board.graph;
+        if not self.board.symmetric:
+            return Position(self.board, graph.child_ids[edge]);
+        return Position(self.board, graph.child_ids[edge],
+                        get_symmetry_table().compose[self.symmetry][graph.child_symmetries[edge]]);
+
+    def get_next_positions(self) -> List[Position]:
+        graph = self.board.graph;
+        return [self.get_child(edge) for edge in range(graph.child_starts[self.id], graph.child_ends[self.id])];
 
     def get_best_move(self) -> Position:
-        max_value = max(position.value for position in list(
-            self.next_positions.values()));
-        return choice([position for position in list(self.next_positions.values()) if position.value == max_value]);
+        cached = self.board.best_edges.get(self.id) if self.board.cache_best_edges else None;
+        stats = self.board.stats;
+        stats.count('best_move_cache_misses' if cached is None else 'best_move_cache_hits') if stats is not None else None;
+        if cached is None:
+            graph = self.board.graph;
+            graph.index_parents() if graph.parent_index is None and self.board.cache_best_edges else None;
+            start, end = graph.child_starts[self.id], graph.child_ends[self.id];
+            values = self.board.values;
+            child_values = [values[child_id] for child_id in graph.child_ids[start:end]];
+            max_value = max(child_values);
+            cached = (max_value, [start + index for index, value in enumerate(child_values) if value == max_value]);
+            if end <= graph.indexed_edges and self.board.cache_best_edges:
+                self.board.best_edges[self.id] = cached;
+        best_edges = cached[1];
+        return self.get_child(best_edges[0] if len(best_edges) < 2 else choice(best_edges));
 
     def get_random_move(self) -> Position:
-        return choice(list(self.next_positions.values()));
+        graph = self.board.graph;
+        return self.get_child(choice(range(graph.child_starts[self.id], graph.child_ends[self.id])));
 
     def get_winner(self) -> str | None:
-        for item in available_items:
-            if (sum(cell == item for index, cell in enumerate(self.items)
-                    if (index % board_size) == int(index / board_size)) == board_size
-                or sum(cell == item for index, cell in enumerate(self.items)
-                       if (board_size - 1 - (index % board_size)) == int(index / board_size)) == board_size):
-                return item;
-            for i in range(0, board_size):
-                if (sum(cell == item for index, cell in enumerate(self.items)
-                        if int(index / board_size) == i) == board_size
-                    or sum(cell == item for index, cell in enumerate(self.items)
-                           if (index % board_size) == i) == board_size):
-                    return item;
-        return None;
+        winner_index = self.board.graph.winners[self.id];
+        return None if winner_index < 0 else available_items[winner_index];
 
-    def search_positions(self, item_index: int = 0) -> None:
-        winner = self.get_winner();
-        if winner is not None:
-            self.value = win_value if winner == self.board.winning_item else lose_value;
-            self.next_positions = None;
-            return;
-        self.value = default_value;
-        self.next_positions = dict();
+    @property
+    def is_terminal(self) -> bool:
+        return bool(self.board.graph.terminals[self.id]);
 
-        new_positions: List[Position] = list();
-        for index, cell in enumerate(self.items):
-            if cell != whitespace:
-                continue;
-            new_items = self.items.copy();
-            new_items[index] = available_items[item_index];
-            new_position = Position(self.board, new_items);
-            string_position = new_position.to_string();
-            if string_position in self.board.all_positions:
-                self.next_positions[string_position] = self.board.all_positions[string_position];
-                continue;
-            self.next_positions[string_position] = new_position;
-            self.board.all_positions[string_position] = new_position;
-            new_positions.append(new_position);
+    @property
+    def is_draw(self) -> bool:
+        return self.board.graph.winners[self.id] < 0 and bool(self.board.graph.terminals[self.id]);
+
+    def get_winning_move(self, item: str) -> Position | None:
+        graph = self.board.graph;
+        edge = graph.win_edges[self.id];
+        if edge < 0 or graph.winners[graph.child_ids[edge]] != available_items.index(item):
+            return None;
+        return self.get_child(edge);
 
-        [position.search_positions((item_index + 1) % len(available_items)) for position in new_positions];
+    def search_positions(self, item_index: int = 0, verbose: bool = False) -> None:
+        level: List[int] = [self.id];
+        depth = 0;
+        searched = 0;
+        started = perf_counter();
+        while len(level) > 0:
+            next_level: List[int] = list();
+            [next_level.extend(self.board.expand(position_id, item_index)) for position_id in level];
+            searched += len(level);
+            if verbose:
+                print(f'[JustGINCS] Move {depth}: {len(level)} positions searched, {len(next_level)} new '
+                      f'({int(searched / max(perf_counter() - started, 1e-9))} positions/sec)');
+            level = next_level;
+            depth += 1;
+            item_index = (item_index + 1) % len(available_items);
 
     def to_string(self) -> str:
         return ''.join(self.items);
 
 
+class Games_History:
+
+    outcomes: array;
+    first_index: int;
+    max_history: int | None;
+    bucket_size: int;
+    checkpoints: array;
+    window_size: int;
+    window_wins: int;
+    wins: int;
+    loses: int;
+    draws: int;
+
+    def __init__(self, max_history: int = default_max_history, bucket_size: int = default_bucket_size, window_size: int = None) -> None:
+        self.max_history = max_history;
+        self.bucket_size = bucket_size;
+        self.window_size = bucket_size if window_size is None else window_size;
+        self.clear();
+
+    def clear(self) -> None:
+        self.outcomes = array('b');
+        self.first_index = 0;
+        self.checkpoints = array('q', [0]);
+        self.window_wins = 0;
+        self.wins = 0;
+        self.loses = 0;
+        self.draws = 0;
+
+    def __len__(self) -> int:
+        return self.first_index + len(self.outcomes);
+
+    def __getitem__(self, index: int | slice) -> bool | None | List[bool | None]:
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)));
+            if len(indices) > 0 and min(indices) < self.first_index:
+                raise IndexError(f'[JustGINCS] Games before {self.first_index} were trimmed from the history');
+            return [None if outcome < 0 else outcome == 1 for outcome in (self.outcomes[index - self.first_index] for index in indices)];
+        index = index + len(self) if index < 0 else index;
+        if index < self.first_index or index >= len(self):
+            raise IndexError(index);
+        outcome = self.outcomes[index - self.first_index];
+        return None if outcome < 0 else outcome == 1;
+
+    def __iter__(self) -> Iterator[bool | None]:
+        if self.first_index > 0:
+            raise IndexError(f'[JustGINCS] Games before {self.first_index} were trimmed from the history');
+        return (None if outcome < 0 else outcome == 1 for outcome in self.outcomes);
+
+    def append(self, winner: bool | None) -> None:
+        outcome = -1 if winner is None else 1 if winner else 0;
+        self.outcomes.append(outcome);
+        if outcome == 1:
+            self.wins += 1;
+            self.window_wins += 1;
+        elif outcome == 0:
+            self.loses += 1;
+        else:
+            self.draws += 1;
+        if len(self.outcomes) > self.window_size and self.outcomes[-self.window_size - 1] == 1:
+            self.window_wins -= 1;
+        if len(self) % self.bucket_size == 0:
+            self.checkpoints.append(self.wins);
+        if self.max_history is not None and len(self.outcomes) >= 2 * max(self.max_history, self.window_size, self.bucket_size):
+            trimmed = (len(self.outcomes) - max(self.max_history, self.window_size, self.bucket_size)) // self.bucket_size * self.bucket_size;
+            del self.outcomes[:trimmed];
+            self.first_index += trimmed;
+
+    def count(self, winner: bool | None) -> int:
+        return self.draws if winner is None else self.wins if winner else self.loses;
+
+    def get_window_rate(self) -> float:
+        return self.window_wins / max(min(len(self), self.window_size), 1);
+
+    def get_wins_before(self, games_count: int) -> int:
+        bucket = min(games_count // self.bucket_size, len(self.checkpoints) - 1);
+        start = bucket * self.bucket_size;
+        if start < self.first_index:
+            if games_count != start:
+                raise IndexError(f'[JustGINCS] Games before {self.first_index} were trimmed, only multiples of {self.bucket_size} are counted');
+            return self.checkpoints[bucket];
+        return self.checkpoints[bucket] + self.outcomes[start - self.first_index:games_count - self.first_index].count(1);
+
+    def get_bytes(self) -> int:
+        return self.outcomes.itemsize * len(self.outcomes) + self.checkpoints.itemsize * len(self.checkpoints);
+
+
+class Game_Log:
+
+    path: str;
+    file: BinaryIO;
+    moves: array;
+    occupied: int;
+    player_types: bytes;
+
+    def __init__(self, path: str = None, file: BinaryIO = None) -> None:
+        self.path = path;
+        self.file = open(path, 'ab') if file is None else file;
+        if self.file.tell() == 0:
+            self.file.write(pack(log_header, log_magic, log_version, board_size, winning_length, len(available_items)));
+        else:
+            read_log_header(path);
+        self.moves = array('B');
+        self.occupied = 0;
+        self.player_types = bytes(len(available_items));
+
+    def attach(self, board: Board) -> None:
+        stats = board.enable_stats(False);
+        stats.add_hook('game_start', self.start_game);
+        stats.add_hook('move', self.add_move);
+        stats.add_hook('game_end', self.end_game);
+
+    def detach(self, board: Board) -> None:
+        board.stats.remove_hook('game_start', self.start_game);
+        board.stats.remove_hook('move', self.add_move);
+        board.stats.remove_hook('game_end', self.end_game);
+        board.disable_stats() if not board.stats.timing and not board.stats.has_hooks() else None;
+
+    def start_game(self, board: Board, players: List[Player]) -> None:
+        self.moves = array('B');
+        self.occupied = 0;
+        self.player_types = bytes(logged_player_types.index(type(player).__name__) if type(player).__name__ in logged_player_types
+                                  else 255 for player in players);
+
+    def add_move(self, board: Board, player: Player, position: Position) -> None:
+        occupied = 0;
+        for mask in (position.masks if position.symmetry else [masks[position.id] for masks in board.graph.masks]):
+            occupied |= mask;
+        self.moves.append((occupied ^ self.occupied).bit_length() - 1);
+        self.occupied = occupied;
+
+    def end_game(self, board: Board, players: List[Player], winner: str | None) -> None:
+        self.write_game(self.moves, -1 if winner is None else available_items.index(winner), self.player_types);
+
+    def write_game(self, moves: array, winner_index: int, player_types: bytes) -> None:
+        self.file.write(pack(log_record, calcsize(log_record) - 4 + len(player_types) + len(moves), winner_index, len(moves)));
+        self.file.write(player_types);
+        self.file.write(moves.tobytes());
+
+    def close(self) -> None:
+        self.file.close();
+
+    @staticmethod
+    def read(path: str) -> Iterator[Tuple[int, bytes, memoryview]]:
+        read_log_header(path);
+        with open(path, 'rb') as file:
+            buffer = memoryview(mmap(file.fileno(), 0, access=ACCESS_READ));
+        return Game_Log.read_buffer(buffer, path);
+
+    @staticmethod
+    def read_buffer(buffer: bytes | memoryview, path: str = '<buffer>') -> Iterator[Tuple[int, bytes, memoryview]]:
+        buffer = memoryview(buffer);
+        read_log_header(path, buffer);
+        offset = calcsize(log_header);
+        while offset + calcsize(log_record) <= len(buffer):
+            length, winner_index, moves_count = unpack_from(log_record, buffer, offset);
+            if offset + 4 + length > len(buffer):
+                break;
+            moves_start = offset + 4 + length - moves_count;
+            yield winner_index, bytes(buffer[offset + calcsize(log_record):moves_start]), buffer[moves_start:moves_start + moves_count];
+            offset += 4 + length;
+
+
 class Player:
 
     item: str;
     name: str;
-    games_history: List[bool | None];
+    games_history: Games_History;
 
-    def __init__(self, board: Board, item: str = 'x', name: str = None) -> None:
+    def __init__(self, board: Board, item: str = 'x', name: str = None, max_history: int = default_max_history) -> None:
         self.board = board;
         self.item = item;
         self.name = name if name is not None else f"{type(self)} {item}";
-        self.games_history = list();
+        self.games_history = Games_History(max_history);
 
     def set_name(self, new_name: str) -> None:
         self.name = new_name;
@@ -170,9 +1417,9 @@ class Player:
             print("No games were played!");
             return;
         total_games = len(self.games_history);
-        win_count = len([game for game in self.games_history if game]);
-        lose_count = len([game for game in self.games_history if game == False]);
-        draw_count = len([game for game in self.games_history if game is None]);
+        win_count = self.games_history.count(True);
+        lose_count = self.games_history.count(False);
+        draw_count = self.games_history.count(None);
         print(f"""
 Player: {self.name}
 Winrate: {win_count / total_games} ({win_count})
@@ -181,17 +1428,38 @@ DrawRate: {draw_count / total_games} ({draw_count})
 
 Total: {total_games}""");
 
-    def throw_me_some_numbers(self, step: int = None) -> None:
-        step = int(len(self.games_history) / 100) if step is None else step;
-        if step < 2:
+    def throw_me_some_numbers(self, step: int = None, path: str = None) -> None:
+        history = self.games_history;
+        step = int(len(history) / 100) if step is None else step;
+        if history.first_index > 0:
+            step = max(step // history.bucket_size, 1) * history.bucket_size;
+        if step < 2 or len(history) < step:
             print("Not enough games for statistics");
             return;
-        means = [self.games_history[i * step: (i + 1) * step].count(True) / step for i in range(0, 100)];
-        games_counts = [step * i + step / 2 for i in range(0, 100)];
-        pyplot.plot(games_counts, means);
-        pyplot.ylabel('Winrate');
-        pyplot.xlabel('Games count');
-        pyplot.show();
+        points = min(100, len(history) // step);
+        means = [(history.get_wins_before((i + 1) * step) - history.get_wins_before(i * step)) / step for i in range(0, points)];
+        games_counts = [step * i + step / 2 for i in range(0, points)];
+        if path is not None and path.lower().endswith('.csv'):
+            with open(path, 'w') as file:
+                file.write('games_count,winrate\n');
+                [file.write(f'{games_count},{mean}\n') for games_count, mean in zip(games_counts, means)];
+            return;
+        if path is None:
+            from matplotlib import pyplot;
+            pyplot.plot(games_counts, means);
+            pyplot.ylabel('Winrate');
+            pyplot.xlabel('Games count');
+            pyplot.show();
+            return;
+        from matplotlib.backends.backend_agg import FigureCanvasAgg;
+        from matplotlib.figure import Figure;
+        figure = Figure();
+        FigureCanvasAgg(figure);
+        axes = figure.add_subplot();
+        axes.plot(games_counts, means);
+        axes.set_ylabel('Winrate');
+        axes.set_xlabel('Games count');
+        figure.savefig(path);
 
 
 class Bot(Player):
@@ -199,32 +1467,277 @@ class Bot(Player):
     epsilon: float;
     alfa: float;
     board: Board;
-    games_history: List[bool | None];
     last_move: Position;
+    trace_decay: float | None;
+    backup_games: int;
+    trajectory: array;
+    trajectory_length: int;
+    game_ends: array;
+    game_outcomes: array;
+    buffered_games: int;
+    trajectory_stamp: Tuple[int, int];
 
-    def __init__(self, board: Board, epsilon: float, alfa: float, item: str = 'x', name: str = 'Bot (x)') -> None:
-        self.games_history: List[bool | None] = list();
+    def __init__(self, board: Board, epsilon: float, alfa: float, item: str = 'x', name: str = 'Bot (x)',
+                 trace_decay: float = None, backup_games: int = 1, max_history: int = default_max_history) -> None:
         self.epsilon = epsilon;
         self.alfa = alfa;
         self.last_move = None;
-        super().__init__(board, item, name);
+        self.trace_decay = trace_decay;
+        self.backup_games = backup_games;
+        self.trajectory = array('l', [0]) * (backup_games * board_size * board_size);
+        self.game_ends = array('l', [0]) * backup_games;
+        self.game_outcomes = array('d', [0.0]) * backup_games;
+        self.trajectory_length = 0;
+        self.buffered_games = 0;
+        self.trajectory_stamp = (-1, -1);
+        super().__init__(board, item, name, max_history);
 
     def new_game(self) -> None:
         self.last_move = None;
+        self.drop_stale_trajectories();
+        self.trajectory_length = self.game_ends[self.buffered_games - 1] if self.buffered_games > 0 else 0;
+
+    def drop_stale_trajectories(self) -> None:
+        stamp = (self.board.graph.compactions, self.board.resets);
+        if stamp != self.trajectory_stamp:
+            self.trajectory_length = 0;
+            self.buffered_games = 0;
+            self.trajectory_stamp = stamp;
+
+    def fix_game(self, winner: bool | None) -> None:
+        super().fix_game(winner);
+        if self.trace_decay is None or self.trajectory_length == (self.game_ends[self.buffered_games - 1] if self.buffered_games > 0 else 0):
+            return;
+        self.game_ends[self.buffered_games] = self.trajectory_length;
+        self.game_outcomes[self.buffered_games] = draw_value if winner is None else win_value if winner else lose_value;
+        self.buffered_games += 1;
+        if self.buffered_games >= self.backup_games:
+            self.backup();
+
+    def backup(self) -> None:
+        self.drop_stale_trajectories();
+        game_start = 0;
+        for game_end, outcome in zip(self.game_ends[:self.buffered_games], self.game_outcomes[:self.buffered_games]):
+            self.back_up_trajectory(self.trajectory[game_start:game_end], outcome);
+            game_start = game_end;
+        self.trajectory_length = 0;
+        self.buffered_games = 0;
+
+    def back_up_trajectory(self, position_ids: array | List[int], outcome: float) -> None:
+        values, trace_decay = self.board.values, 0.0 if self.trace_decay is None else self.trace_decay;
+        target, later_value = outcome, None;
+        for position_id in reversed(position_ids):
+            target = target if later_value is None else (1.0 - trace_decay) * later_value + trace_decay * target;
+            later_value = values[position_id];
+            self.board.set_value(position_id, later_value + self.alfa * (target - later_value));
+
+    def learn_game(self, moves: bytes | memoryview, winner_index: int) -> None:
+        item_index = available_items.index(self.item);
+        masks = [0 for _ in available_items];
+        position_ids: List[int] = list();
+        for move_index, move in enumerate(moves):
+            masks[move_index % len(available_items)] |= 1 << move;
+            if move_index % len(available_items) == item_index:
+                position = self.board.find_masks(tuple(masks), move);
+                position_ids.append(position.id) if position is not None else None;
+        if len(position_ids) > 0:
+            self.back_up_trajectory(position_ids, draw_value if winner_index < 0 else
+                                    win_value if winner_index == item_index else lose_value);
+
+    def learn_from_log(self, path: str, games_count: int = None) -> int:
+        learned = 0;
+        for winner_index, _, moves in Game_Log.read(path):
+            if games_count is not None and learned >= games_count:
+                break;
+            self.learn_game(moves, winner_index);
+            learned += 1;
+        return learned;
+
+    def save(self, path: str) -> None:
+        self.backup() if self.trace_decay is not None else None;
+        self.board.save(path, self.alfa, self.epsilon);
+
+    def freeze(self, name: str = None) -> Frozen_Bot:
+        self.backup() if self.trace_decay is not None else None;
+        return Frozen_Bot(self, name);
+
+    def load(self, path: str, writable: bool = True, max_positions: int = None) -> None:
+        header = read_header(path);
+        if available_items[header['winning_item']] != self.item:
+            raise ValueError(f"[JustGINCS] {path} was saved for {available_items[header['winning_item']]}, not {self.item}");
+        self.board = Board.load(path, writable, max_positions=max_positions);
+        self.trajectory_length = 0;
+        self.buffered_games = 0;
+        self.trajectory_stamp = (self.board.graph.compactions, self.board.resets);
+        self.alfa = header['alfa'];
+        self.epsilon = header['epsilon'];
 
     def get_move(self, board: Board) -> Position:
-        self_position = self.board.all_positions[board.position.to_string()];
+        stats = board.stats;
+        timed = stats is not None and stats.timing;
+        started = perf_counter() if timed else 0.0;
+        values = self.board.values;
+        self_position = self.board.find_position(board.position);
+        stats.count('own_board_moves' if board is self.board else 'cross_board_lookups') if stats is not None else None;
         is_greedy = random() > self.epsilon;
         move = self_position.get_best_move() if is_greedy else self_position.get_random_move();
-        if self.last_move is not None:
+        if timed:
+            stats.add_time('select', perf_counter() - started);
+            started = perf_counter();
+        if self.trace_decay is not None:
+            self.trajectory[self.trajectory_length] = move.id;
+            self.trajectory_length += 1;
+        elif self.last_move is not None:
             if move.value == 1.0:
                 a = 1;
                 b = 2;
-            self.last_move.value += self.alfa * (move.value - self.last_move.value);
+            self.board.set_value(self.last_move.id, values[self.last_move.id] + self.alfa * (values[move.id] - values[self.last_move.id]));
         self.last_move = move;
+        stats.add_time('td_update', perf_counter() - started) if timed else None;
         return move;
 
 
+class Frozen_Bot(Player):
+
+    board: Board;
+    policy_starts: array;
+    policy_ends: array;
+    policy_edges: array;
+    compactions: int;
+
+    def __init__(self, bot: Bot, name: str = None) -> None:
+        super().__init__(bot.board, bot.item, f'{bot.name} (frozen)' if name is None else name);
+        self.compile();
+
+    def compile(self) -> None:
+        graph, values = self.board.graph, self.board.values;
+        self.policy_starts, self.policy_ends, self.policy_edges = array('l'), array('l'), array('l');
+        for position_id in range(0, len(graph)):
+            start, end = graph.child_starts[position_id], graph.child_ends[position_id];
+            self.policy_starts.append(len(self.policy_edges));
+            if end - start > 0:
+                child_values = [values[child_id] for child_id in graph.child_ids[start:end]];
+                max_value = max(child_values);
+                self.policy_edges.extend(start + index for index, value in enumerate(child_values) if value == max_value);
+            self.policy_ends.append(len(self.policy_edges));
+        self.compactions = graph.compactions;
+
+    def covers(self, graph: Game_Graph) -> bool:
+        return graph is self.board.graph and graph.compactions == self.compactions and len(self.policy_starts) == len(graph) and all(
+            graph.child_starts[position_id] >= 0 for position_id in range(0, len(graph)));
+
+    def get_move(self, board: Board) -> Position:
+        position = self.board.find_position(board.position);
+        graph = self.board.graph;
+        if graph.compactions != self.compactions or position.id >= len(self.policy_starts) or (
+                self.policy_starts[position.id] == self.policy_ends[position.id]):
+            return position.get_best_move();
+        start, end = self.policy_starts[position.id], self.policy_ends[position.id];
+        return position.get_child(self.policy_edges[start] if end - start < 2 else choice(self.policy_edges[start:end]));
+
+
+class Snapshot_Bot(Bot):
+
+    def get_move(self, board: Board) -> Position:
+        position = self.board.find_position(board.position);
+        return position.get_best_move() if random() > self.epsilon else position.get_random_move();
+
+
+class Learner:
+
+    bot: Bot;
+    opponent: str;
+    snapshot_games: int;
+    random_seed: int;
+    authkey: bytes;
+    listener: object;
+    address: Tuple[str, int] | str;
+    connections: List[object];
+    processes: List[object];
+    learned: int;
+    broadcasts: int;
+
+    def __init__(self, bot: Bot, opponent: str = 'Randomer', address: Tuple[str, int] | str = None, authkey: bytes = None,
+                 snapshot_games: int = default_snapshot_games, random_seed: int = 0) -> None:
+        from multiprocessing.connection import Listener;
+        self.bot = bot;
+        self.opponent = opponent;
+        self.snapshot_games = snapshot_games;
+        self.random_seed = random_seed;
+        self.authkey = urandom(16) if authkey is None else authkey;
+        self.listener = Listener(('localhost', 0) if address is None else address, authkey=self.authkey);
+        self.address = self.listener.address;
+        self.connections = list();
+        self.processes = list();
+        self.learned = 0;
+        self.broadcasts = 0;
+
+    def get_snapshot(self) -> Tuple:
+        board = self.bot.board;
+        if board.lazy and board.max_positions is not None and len(board.graph) > board.max_positions:
+            board.shrink();
+        if not board.lazy:
+            return ('values', array('d', board.values).tobytes());
+        return ('positions', [array('Q', masks).tobytes() for masks in board.graph.masks], array('d', board.values).tobytes());
+
+    def spawn_workers(self, count: int, chunk_games: int = default_chunk_size) -> None:
+        from multiprocessing import get_context;
+        context = get_context('spawn');
+        processes = [context.Process(target=run_worker, args=(self.address, self.authkey, chunk_games), daemon=True)
+                     for _ in range(0, count)];
+        [process.start() for process in processes];
+        self.processes.extend(processes);
+        self.accept(count);
+
+    def accept(self, count: int) -> None:
+        for _ in range(0, count):
+            connection = self.listener.accept();
+            connection.send({'board_size': board_size, 'winning_length': winning_length, 'item': self.bot.item,
+                             'epsilon': self.bot.epsilon, 'lazy': self.bot.board.lazy, 'symmetric': self.bot.board.symmetric,
+                             'max_positions': self.bot.board.max_positions, 'opponent': self.opponent,
+                             'seed': self.random_seed + len(self.connections)});
+            connection.send(self.get_snapshot());
+            self.connections.append(connection);
+
+    def serve(self, games_count: int) -> int:
+        from multiprocessing.connection import wait;
+        item_index = available_items.index(self.bot.item);
+        started, last_broadcast = self.learned, self.learned;
+        while self.learned - started < games_count and len(self.connections) > 0:
+            for connection in wait(self.connections):
+                try:
+                    data = connection.recv_bytes();
+                except (EOFError, OSError):
+                    self.connections.remove(connection);
+                    continue;
+                for winner_index, _, moves in Game_Log.read_buffer(data):
+                    self.bot.learn_game(moves, winner_index);
+                    self.bot.games_history.append(None if winner_index < 0 else winner_index == item_index);
+                    self.learned += 1;
+            if self.learned - last_broadcast >= self.snapshot_games:
+                self.broadcast(self.get_snapshot());
+                last_broadcast = self.learned;
+        return self.learned - started;
+
+    def broadcast(self, message: Tuple) -> None:
+        for connection in list(self.connections):
+            try:
+                connection.send(message);
+            except OSError:
+                self.connections.remove(connection);
+        self.broadcasts += 1 if message[0] != 'stop' else 0;
+
+    def close(self) -> None:
+        self.broadcast(('stop',));
+        [connection.close() for connection in self.connections];
+        self.connections = list();
+        for process in self.processes:
+            process.join(default_worker_timeout);
+            process.terminate() if process.is_alive() else None;
+        self.processes = list();
+        self.listener.close();
+
+
 class Randomer(Player):
 
     def get_move(self, board: Board) -> Position:
@@ -234,9 +1747,62 @@ class Randomer(Player):
 class Smart_Randomer(Player):
 
     def get_move(self, board: Board = None) -> Position:
-        possible_moves = list(board.position.next_positions.values());
-        best_move = next((move for move in possible_moves if move.get_winner() == self.item), None);
-        return best_move if best_move is not None else choice(possible_moves);
+        best_move = board.position.get_winning_move(self.item);
+        return best_move if best_move is not None else board.position.get_random_move();
+
+
+class Perfect(Player):
+
+    depth: int | None;
+
+    def __init__(self, board: Board, item: str = 'x', name: str = None, depth: int = None) -> None:
+        self.depth = depth;
+        super().__init__(board, item, name);
+
+    def get_move(self, board: Board) -> Position:
+        if self.depth is None and not board.lazy:
+            return board.position.get_child(board.graph.solve()[board.position.id]);
+        masks, last_move = board.position.masks, board.position.last_move;
+        table = transposition_tables.setdefault((board_size, winning_length), dict());
+        self.search(table, masks, last_move, self.depth if self.depth is not None else default_perfect_depth,
+                    -perfect_score - 1, perfect_score + 1);
+        move = table[to_key(masks)][3];
+        item_index = available_items.index(self.item);
+        return board.position.next_positions[to_key(tuple(mask | 1 << move if index == item_index else mask
+                                                           for index, mask in enumerate(masks)))];
+
+    def search(self, table: Dict[int, Tuple[int, int, int, int]], masks: Tuple[int, ...], last_move: int | None,
+               depth: int, alpha: int, beta: int) -> int:
+        if get_line_table().get_winner(masks, last_move) is not None:
+            return -perfect_score;
+        occupied = 0;
+        for mask in masks:
+            occupied |= mask;
+        free_cells = [index for index in range(0, board_size * board_size) if not occupied >> index & 1];
+        if len(free_cells) < 1 or depth < 1:
+            return 0;
+        key = to_key(masks);
+        entry = table.get(key);
+        if entry is not None and entry[0] >= depth:
+            if entry[2] == 0 or (entry[2] > 0 and entry[1] >= beta) or (entry[2] < 0 and entry[1] <= alpha):
+                return entry[1];
+        if entry is not None:
+            free_cells.remove(entry[3]);
+            free_cells.insert(0, entry[3]);
+        item_index = occupied.bit_count() % len(available_items);
+        original_alpha = alpha;
+        best_score, best_move = -perfect_score - 1, free_cells[0];
+        for index in free_cells:
+            new_masks = tuple(mask | 1 << index if i == item_index else mask for i, mask in enumerate(masks));
+            score = -self.search(table, new_masks, index, depth - 1, -beta, -alpha);
+            score = score - 1 if score > 0 else score + 1 if score < 0 else 0;
+            if score > best_score:
+                best_score, best_move = score, index;
+            alpha = max(alpha, score);
+            if alpha >= beta:
+                break;
+        table[key] = (depth, best_score, -1 if best_score <= original_alpha else 1 if best_score >= beta else 0, best_move);
+        return best_score;
 
 
 class Human(Player):
@@ -251,13 +1817,14 @@ class Human(Player):
                 if x < 1 or y < 1 or x > board_size or y > board_size:
                     print(f'Wrong numbers, it should be more then 0 and less then board size ({board_size})');
                     continue;
-                if board.position.items[(x - 1) * board_size + (y - 1)] != whitespace:
+                move_mask = 1 << ((x - 1) * board_size + (y - 1));
+                if any(mask & move_mask for mask in board.position.masks):
                     print('Cell is already taken');
                     continue;
                 else:
-                    new_items = board.position.items.copy();
-                    new_items[(x - 1) * board_size + (y - 1)] = self.item;
-                    new_position_key = "".join(new_items);
+                    item_index = available_items.index(self.item);
+                    new_position_key = to_key(tuple(mask | move_mask if i == item_index else mask
+                                                    for i, mask in enumerate(board.position.masks)));
                     if new_position_key not in board.position.next_positions:
                         print('Wrong position anyway...');
                         continue;
@@ -265,7 +1832,7 @@ class Human(Player):
                     winner = new_position.get_winner();
                     if winner is not None:
                         print(f"{self.name}, you {'won' if winner == self.item else 'lost'}!");
-                    elif new_position.next_positions is None or len(new_position.next_positions) < 1:
+                    elif new_position.is_draw:
                         print(f"{self.name}, it is draw!");
                     return new_position;
             except:
@@ -291,34 +1858,56 @@ if __name__ == '__main__':
     humans: Dict[str, Player] = dict();
     randomizers: Dict[str, Player] = dict();
     smart_randomizers: Dict[str, Player] = dict();
+    perfects: Dict[str, Player] = dict();
     bots: Dict[str, Player] = dict();
+    jobs: Dict[str, Training_Job] = dict();
+    shared_graph: Game_Graph = None;
+    shared_graph_lazy: bool = board_size > 3;
     for item in available_items:
-        new_board = Board(item);
+        new_board = Board(item, lazy=shared_graph_lazy, graph=shared_graph);
+        shared_graph = new_board.graph;
         humans[item] = Human(new_board, item, f'Human {item}');
         randomizers[item] = Randomer(new_board, item, f'Randomizer {item}');
         smart_randomizers[item] = Smart_Randomer(new_board, item, f"Smart Randomizer ({item})");
+        perfects[item] = Perfect(new_board, item, f'Perfect {item}');
         bots[item] = Bot(new_board, default_epsilon, default_alpha, item, f'AI {item}');
 
-    players = list(humans.values()) + list(randomizers.values()) + list(smart_randomizers.values()) + list(bots.values());
+    players = list(humans.values()) + list(randomizers.values()) + list(smart_randomizers.values()) + list(perfects.values()) + list(
+        bots.values());
 
     print('[JustGINCS] Initializing boards, wait, please...');
-    [bot.board.position.search_positions() for bot in bots.values()];
+    if not shared_graph_lazy:
+        bots[available_items[0]].board.position.search_positions(verbose=True);
+
+    def is_busy(*checked_players: Player) -> bool:
+        busy_job = next((job for job in jobs.values() if job.is_running and (
+            shared_graph_lazy or any(player in job.players for player in checked_players))), None);
+        print(f'[JustGINCS] {busy_job.name} is running, wait or cancel it first') if busy_job is not None else None;
+        return busy_job is not None;
 
     while True:
+        for item, job in list(jobs.items()):
+            print(job.get_status());
+            jobs.pop(item) if not job.is_running else None;
         number = Comfortable_Counter();
         input_number = input_int(f"""[JustGINCS] Choose what to do:
 
 {''.join([f"{next(number)}. Change properties of bot {bot.name}🤡" for bot in bots.values()])}
 {''.join([f"{next(number)}. Educate bot {bot.name} with randomizer🤡" for bot in bots.values()])}
 {''.join([f"{next(number)}. Educate bot {bot.name} with smart randomizer🤡" for bot in bots.values()])}
+{''.join([f"{next(number)}. Educate bot {bot.name} with perfect player🤡" for bot in bots.values()])}
 {''.join([f"{next(number)}. Reset education for bot {bot.name}🤡" for bot in bots.values()])}
 {''.join([f"{next(number)}. Play with bot as {item}🤡" for item in bots.keys()])}
 {''.join([f"{next(number)}. Get statistic of {player.name}🤡" for player in players])}
 {''.join([f"{next(number)}. Clear statistic of {player.name}🤡" for player in players])}
 {''.join([f"{next(number)}. Print graph for {player.name}🤡" for player in players])}
+{''.join([f"{next(number)}. Save bot {bot.name}🤡" for bot in bots.values()])}
+{''.join([f"{next(number)}. Load bot {bot.name}🤡" for bot in bots.values()])}
+{''.join([f"{next(number)}. Cancel education of bot {bot.name}🤡" for bot in bots.values()])}
 
 Enter a value: """.replace('🤡', '\n'), number.current_value);
         if input_number < 0:
+            [job.cancel() for job in jobs.values()];
             break;
         elif input_number <= 1 * len(bots):
             item = available_items[(input_number - 1) % len(bots)];
@@ -326,8 +1915,9 @@ Enter a value: """.replace('🤡', '\n'), number.current_value);
 1. Name
 2. Alpha
 3. Epsilon
+4. Trace decay (empty for one-step TD)
 
-Enter a value: ''', 3);
+Enter a value: ''', 4);
             if parameter_number < 0:
                 continue;
             value_str = input('[JustGINCS] Enter a value for parameter: ');
@@ -337,31 +1927,67 @@ Enter a value: ''', 3);
                 bots[item].alfa = float(value_str);
             elif parameter_number == 3 and value_str.replace('.', '', 1).isdigit() and float(value_str) > 0 and float(value_str) <= 1:
                 bots[item].epsilon = float(value_str);
+            elif parameter_number == 4 and (value_str == '' or (value_str.replace('.', '', 1).isdigit() and float(value_str) <= 1)):
+                if is_busy(bots[item]):
+                    continue;
+                bots[item].backup() if bots[item].trace_decay is not None else None;
+                bots[item].trace_decay = float(value_str) if value_str else None;
             else:
                 print('[JustGINCS] Error, canceling operation');
-        elif input_number <= 3 * len(bots):
+        elif input_number <= 4 * len(bots):
             games_count = input_int(
                 message ='[JustGINCS] Enter number of games to be played: ', error_message='[JustGINCS] Wrong games count');
             if games_count < 0:
                 continue;
             item = available_items[(input_number - 1) % len(bots)];
-            opponents = [bot for bot in randomizers.values() if bot.item != item] if input_number <= 2 * len(bots) else [bot for bot in smart_randomizers.values() if bot.item != item]
+            opponents = [bot for bot in (randomizers if input_number <= 2 * len(bots) else smart_randomizers if input_number <= 3 * len(bots)
+                                         else perfects).values() if bot.item != item];
             opponents.append(bots[item])
-            bots[item].board.play_many(opponents, games_count);
-        elif input_number <= 4 * len(bots):
-            item = available_items[(input_number - 1) % len(bots)];
-            bots[item].board = Board(item);
+            if is_busy(*opponents):
+                continue;
+            early_stop = input('[JustGINCS] Stop early once values converge? (y/N): ').strip().lower() == 'y';
+            jobs[item] = Training_Job(f'Education of bot {bots[item].name}', bots[item].board, opponents, games_count,
+                                      default_batch_size, convergence=Convergence() if early_stop else None).start();
+            print(f'[JustGINCS] Education of bot {bots[item].name} started in background');
         elif input_number <= 5 * len(bots):
+            item = available_items[(input_number - 1) % len(bots)];
+            if is_busy(bots[item]):
+                continue;
+            bots[item].board.reset();
+        elif input_number <= 6 * len(bots):
             item = available_items[(input_number - 1) % len(bots)];
             opponents = [bot for bot in bots.values() if bot.item != item];
+            if is_busy(*opponents):
+                continue;
             opponents.append(humans[item]);
-            choice(opponents).board.play(opponents, True);
-        elif input_number <= 5 * len(bots) + len(players):
-            index = input_number - 5 * len(bots) - 1;
+            opponents[0].board.play(opponents, True);
+        elif input_number <= 6 * len(bots) + len(players):
+            index = input_number - 6 * len(bots) - 1;
             players[index].print_stats();
-        elif input_number <= 5 * len(bots) + 2 * len(players):
-            index = input_number - 5 * len(bots) - len(players) - 1;
-            players[index].games_history = list();
-        elif input_number <= 5 * len(bots) + 3 * len(players):
-            index = input_number - 5 * len(bots) - 2 * len(players) - 1;
-            players[index].throw_me_some_numbers();
\ No newline at end of file
+        elif input_number <= 6 * len(bots) + 2 * len(players):
+            index = input_number - 6 * len(bots) - len(players) - 1;
+            if is_busy(players[index]):
+                continue;
+            players[index].games_history.clear();
+        elif input_number <= 6 * len(bots) + 3 * len(players):
+            index = input_number - 6 * len(bots) - 2 * len(players) - 1;
+            path = input('[JustGINCS] Enter a .png or .csv file name to save the graph (empty to show it): ');
+            try:
+                players[index].throw_me_some_numbers(path=path if path else None);
+            except (OSError, ImportError) as error:
+                print(f'[JustGINCS] Error, canceling operation: {error}');
+        elif input_number <= 8 * len(bots) + 3 * len(players):
+            item = available_items[(input_number - 6 * len(bots) - 3 * len(players) - 1) % len(bots)];
+            if is_busy(bots[item]):
+                continue;
+            path = input(f'[JustGINCS] Enter a file name (bot_{item}.bin by default): ') or f'bot_{item}.bin';
+            try:
+                bots[item].save(path) if input_number <= 7 * len(bots) + 3 * len(players) else bots[item].load(path, max_positions=bots[item].board.max_positions);
+            except (OSError, ValueError) as error:
+                print(f'[JustGINCS] Error, canceling operation: {error}');
+        elif input_number <= 9 * len(bots) + 3 * len(players):
+            item = available_items[(input_number - 8 * len(bots) - 3 * len(players) - 1) % len(bots)];
+            if item in jobs:
+                jobs[item].cancel();
+            else:
+                print(f'[JustGINCS] Bot {bots[item].name} is not being educated');
\ No newline at end of file
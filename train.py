@@ -0,0 +1,173 @@
+from typing import Dict, List, Tuple;
+from argparse import ArgumentParser, Namespace;
+from json import dumps;
+from random import seed;
+from time import perf_counter;
+import tic_tac_toe;
+from tic_tac_toe import (Board, Bot, Convergence, Game_Log, Learner, Perfect, Player, Randomer, Smart_Randomer, default_alpha,
+                         default_batch_size, default_chunk_size, default_epsilon, default_snapshot_games, run_worker, set_board_size);
+
+opponent_types: Dict[str, type] = {'randomer': Randomer, 'smart': Smart_Randomer, 'perfect': Perfect};
+
+
+def parse_items(values: List[str], items: List[str], default: object = None, value_type: type = float) -> Dict[str, object]:
+    parsed = {item: default for item in items};
+    for value in values or list():
+        item, _, item_value = value.rpartition('=');
+        if item == '':
+            parsed = {item: value_type(item_value) for item in items};
+        elif item in parsed:
+            parsed[item] = value_type(item_value);
+        else:
+            raise ValueError(f'[JustGINCS] Unknown item {item} in {value}');
+    return parsed;
+
+
+def parse_address(address: str | None) -> Tuple[str, int] | str | None:
+    if address is None or ':' not in address:
+        return address;
+    host, _, port = address.rpartition(':');
+    return host, int(port);
+
+
+def build_bots(arguments: Namespace) -> Dict[str, Bot]:
+    alphas = parse_items(arguments.alpha, arguments.bots);
+    epsilons = parse_items(arguments.epsilon, arguments.bots);
+    loads = parse_items(arguments.load, arguments.bots, None, str);
+    bots: Dict[str, Bot] = dict();
+    graph = None;
+    for item in arguments.bots:
+        board = Board(item, arguments.lazy, arguments.max_positions, arguments.symmetric, graph) if loads[item] is None else None;
+        bot = Bot(board, default_epsilon if epsilons[item] is None else epsilons[item], default_alpha if alphas[item] is None else alphas[item],
+                  item, f'Bot ({item})', arguments.trace_decay, max_history=arguments.max_history);
+        if loads[item] is not None:
+            bot.load(loads[item], max_positions=arguments.max_positions);
+            bot.epsilon = bot.epsilon if epsilons[item] is None else epsilons[item];
+            bot.alfa = bot.alfa if alphas[item] is None else alphas[item];
+        graph = bot.board.graph if loads[item] is None else graph;
+        bots[item] = bot;
+    if not arguments.lazy:
+        [bot.board.position.search_positions() for bot in bots.values() if bot.board.graph.child_starts[0] < 0];
+    return bots;
+
+
+def get_opponents(bot: Bot, arguments: Namespace, bots: Dict[str, Bot]) -> List[Player]:
+    if arguments.opponent == 'bot':
+        return [bots[item] for item in tic_tac_toe.available_items if item != bot.item];
+    return [opponent_types[arguments.opponent](bot.board, item, f'{arguments.opponent} ({item})')
+            for item in tic_tac_toe.available_items if item != bot.item];
+
+
+def get_rates(player: Player, games_count: int) -> Dict[str, float]:
+    history = player.games_history;
+    return {'win_rate': history.count(True) / max(games_count, 1), 'lose_rate': history.count(False) / max(games_count, 1),
+            'draw_rate': history.count(None) / max(games_count, 1)};
+
+
+def train_distributed(bot: Bot, opponents: List[Player], arguments: Namespace) -> Dict[str, object]:
+    learner = Learner(bot, type(opponents[0]).__name__, parse_address(arguments.listen),
+                      None if arguments.authkey is None else arguments.authkey.encode(), arguments.snapshot_games, arguments.seed);
+    started = perf_counter();
+    try:
+        learner.spawn_workers(arguments.workers, arguments.chunk_games) if arguments.workers > 0 else None;
+        learner.accept(arguments.remote_workers);
+        played = learner.serve(arguments.games);
+    finally:
+        learner.close();
+    seconds = perf_counter() - started;
+    return {'item': bot.item, 'alpha': bot.alfa, 'epsilon': bot.epsilon, 'opponent': arguments.opponent, 'games': played,
+            'workers': arguments.workers + arguments.remote_workers, 'snapshots': learner.broadcasts, 'seconds': seconds,
+            'games_per_sec': played / max(seconds, 1e-9), **get_rates(bot, played)};
+
+
+def train(bot: Bot, opponents: List[Player], arguments: Namespace) -> Dict[str, object]:
+    if arguments.workers > 0 or arguments.remote_workers > 0:
+        return train_distributed(bot, opponents, arguments);
+    convergence = Convergence() if arguments.converge else None;
+    log = Game_Log(arguments.log) if arguments.log is not None else None;
+    log.attach(bot.board) if log is not None else None;
+    started = perf_counter();
+    try:
+        played = bot.board.play_many([bot] + opponents, arguments.games, None if log is not None else arguments.batch_size or None,
+                                     None if log is not None else arguments.processes, convergence);
+    finally:
+        if log is not None:
+            log.detach(bot.board);
+            log.close();
+    seconds = perf_counter() - started;
+    return {'item': bot.item, 'alpha': bot.alfa, 'epsilon': bot.epsilon, 'opponent': arguments.opponent, 'games': played,
+            'converged': None if convergence is None else convergence.converged, 'seconds': seconds,
+            'games_per_sec': played / max(seconds, 1e-9), **get_rates(bot, played)};
+
+
+def evaluate(bot: Bot, opponents: List[Player], arguments: Namespace) -> Dict[str, object]:
+    frozen_bot = bot.freeze();
+    opponents = [opponent.freeze() if isinstance(opponent, Bot) else opponent for opponent in opponents];
+    started = perf_counter();
+    bot.board.play_many([frozen_bot] + opponents, arguments.evaluate, arguments.batch_size or None);
+    seconds = perf_counter() - started;
+    return {'item': bot.item, 'opponent': arguments.opponent, 'games': arguments.evaluate, 'seconds': seconds,
+            'games_per_sec': arguments.evaluate / max(seconds, 1e-9), **get_rates(frozen_bot, arguments.evaluate)};
+
+
+def run(arguments: Namespace) -> Dict[str, object]:
+    set_board_size(arguments.board_size, arguments.winning_length);
+    seed(arguments.seed);
+    started = perf_counter();
+    bots = build_bots(arguments);
+    results: Dict[str, object] = {'board_size': tic_tac_toe.board_size, 'winning_length': tic_tac_toe.winning_length,
+                                  'seed': arguments.seed, 'build_seconds': perf_counter() - started,
+                                  'positions': len(next(iter(bots.values())).board.graph)};
+    trained = list(bots.values())[:1] if arguments.opponent == 'bot' else list(bots.values());
+    results['train'] = [train(bot, get_opponents(bot, arguments, bots), arguments) for bot in trained];
+    if arguments.evaluate > 0:
+        results['evaluate'] = [evaluate(bot, get_opponents(bot, arguments, bots), arguments) for bot in bots.values()];
+    saves = parse_items(arguments.save, arguments.bots, None, str);
+    [bot.save(saves[item]) for item, bot in bots.items() if saves[item] is not None];
+    return results;
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='[JustGINCS] Non-interactive Tic-Tac-Toe bot training and evaluation');
+    parser.add_argument('--board-size', type=int, default=3);
+    parser.add_argument('--winning-length', type=int, default=None, help='board size by default');
+    parser.add_argument('--bots', type=str, nargs='+', default=['x'], help='items played by bots');
+    parser.add_argument('--alpha', type=str, nargs='+', default=None, help='value for all bots or item=value pairs');
+    parser.add_argument('--epsilon', type=str, nargs='+', default=None, help='value for all bots or item=value pairs');
+    parser.add_argument('--trace-decay', type=float, default=None, help='TD(lambda) trace decay, one-step TD by default');
+    parser.add_argument('--opponent', type=str, choices=list(opponent_types) + ['bot'], default='randomer');
+    parser.add_argument('--games', type=int, default=10000, help='training games per bot');
+    parser.add_argument('--evaluate', type=int, default=0, help='games played by frozen bots after training');
+    parser.add_argument('--seed', type=int, default=0);
+    parser.add_argument('--batch-size', type=int, default=default_batch_size, help='0 plays serial games');
+    parser.add_argument('--processes', type=int, default=None);
+    parser.add_argument('--converge', action='store_true', help='stop training once values converge');
+    parser.add_argument('--lazy', action='store_true');
+    parser.add_argument('--symmetric', action='store_true');
+    parser.add_argument('--max-positions', type=int, default=None);
+    parser.add_argument('--max-history', type=int, default=None, help='game outcomes kept per bot beyond the running counts');
+    parser.add_argument('--load', type=str, nargs='+', default=None, help='file for all bots or item=file pairs');
+    parser.add_argument('--save', type=str, nargs='+', default=None, help='file for all bots or item=file pairs');
+    parser.add_argument('--log', type=str, default=None, help='game log to append training games to, plays them serially');
+    parser.add_argument('--workers', type=int, default=0, help='local self-play worker processes feeding this learner');
+    parser.add_argument('--remote-workers', type=int, default=0, help='workers started elsewhere with --connect');
+    parser.add_argument('--listen', type=str, default=None, help='learner host:port or Unix socket path (localhost by default)');
+    parser.add_argument('--connect', type=str, default=None, help='run only as a worker of the learner at host:port or path');
+    parser.add_argument('--authkey', type=str, default=None, help='shared secret of learner and remote workers');
+    parser.add_argument('--snapshot-games', type=int, default=default_snapshot_games, help='learned games between value broadcasts');
+    parser.add_argument('--chunk-games', type=int, default=default_chunk_size, help='games a worker plays per message');
+    parser.add_argument('--output', type=str, default=None, help='JSON file for the results (stdout by default)');
+    arguments = parser.parse_args();
+    if arguments.opponent == 'bot' and len(arguments.bots) < 2:
+        parser.error('--opponent bot needs a bot for every item');
+    if arguments.opponent == 'bot' and arguments.workers + arguments.remote_workers > 0:
+        parser.error('workers play against randomer, smart or perfect opponents only');
+    if (arguments.remote_workers > 0 or arguments.connect is not None) and arguments.authkey is None:
+        parser.error('remote workers need --authkey');
+    if arguments.connect is not None:
+        run_worker(parse_address(arguments.connect), arguments.authkey.encode(), arguments.chunk_games);
+    elif arguments.output is None:
+        print(dumps(run(arguments), indent=2));
+    else:
+        with open(arguments.output, 'w') as file:
+            file.write(dumps(run(arguments), indent=2));